@@ -0,0 +1,268 @@
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List
+
+from instrumented_repository import InstrumentedProductoRepository
+from metricas import Metricas, MonitorConsultas
+from repositorio import ProductoRepository
+
+# Benchmark del repositorio de productos.
+# Siembra catálogos sintéticos reproducibles (misma semilla => mismos datos y mismas consultas),
+# mide cada operación del repositorio con uno o varios hilos y escribe los resultados en JSON.
+#
+#   python benchmark.py --backend sqlite --filas 1000 100000 --hilos 1 8
+#   BENCH_DB_NAME=hardware_shop_bench python benchmark.py --backend postgres --filas 1000000
+#
+# Con PostgreSQL se exige una base de datos dedicada y con la tabla de productos vacía: las
+# filas de la aplicación alterarían los recorridos y las consultas de stock bajo.
+
+CATEGORIAS = ["Tarjeta gráfica", "Placa base", "Monitor", "Teclado", "Ratón", "SSD", "Fuente", "Memoria RAM"]
+MARCAS = ["ASUS", "MSI", "Gigabyte", "Corsair", "Samsung", "Kingston", "Logitech", "NVIDIA"]
+# Operaciones que modifican el catálogo; se miden después de todas las lecturas de cada tamaño
+# para que éstas vean siempre exactamente el catálogo sembrado.
+ESCRITURAS = ("insert", "update", "patch")
+
+
+def generar_catalogo(filas: int, semilla: int) -> Iterator[Dict[str, Any]]:
+    """Genera un catálogo sintético fila a fila; aproximadamente un 10% de los productos tiene stock bajo."""
+    rnd = random.Random(semilla)
+    for i in range(filas):
+        stock = rnd.randint(0, 5) if rnd.random() < 0.1 else rnd.randint(6, 500)
+        yield {
+            "nombre": f"{rnd.choice(CATEGORIAS)} {rnd.choice(MARCAS)} #{i}",
+            "precio": round(rnd.uniform(5, 2500), 2),
+            "stock": stock,
+        }
+
+
+def sembrar(repo: ProductoRepository, filas: int, semilla: int, ids: List[int], lote: int = 10000) -> List[int]:
+    """
+    Inserta el catálogo sintético en bloques y añade a `ids` los IDs de cada bloque según se crea,
+    de modo que quien llama puede borrar lo sembrado aunque la siembra falle a medias. Sólo se
+    genera en memoria un bloque de `lote` filas cada vez.
+    """
+    catalogo = generar_catalogo(filas, semilla)
+    while True:
+        bloque = list(islice(catalogo, lote))
+        if not bloque:
+            break
+        creados = repo.create_many(bloque)
+        if not creados:
+            raise RuntimeError("No se pudo sembrar el catálogo de prueba.")
+        ids.extend(creados)
+    return ids
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por rango más cercano de una lista ya ordenada."""
+    if not valores:
+        return 0.0
+    rango = max(1, math.ceil(p / 100 * len(valores)))
+    return valores[rango - 1]
+
+
+def medir(operacion: Callable[[random.Random], bool], repeticiones: int, hilos: int, semilla: int) -> Dict[str, Any]:
+    """
+    Ejecuta `operacion` `repeticiones` veces repartidas entre `hilos` hilos.
+
+    La operación recibe un generador aleatorio propio del hilo y devuelve False si falló.
+    """
+    def trabajador(indice: int) -> tuple[List[float], int]:
+        rnd = random.Random(semilla * 1000 + indice)
+        cantidad = repeticiones // hilos + (1 if indice < repeticiones % hilos else 0)
+        latencias, errores = [], 0
+        for _ in range(cantidad):
+            inicio = time.perf_counter()
+            try:
+                ok = operacion(rnd)
+            except Exception as e:
+                logging.error("Error durante el benchmark: %s", e)
+                ok = False
+            latencias.append(time.perf_counter() - inicio)
+            if not ok:
+                errores += 1
+        return latencias, errores
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        parciales = list(executor.map(trabajador, range(hilos)))
+    duracion = time.perf_counter() - inicio
+
+    latencias = sorted(lat for parcial in parciales for lat in parcial[0])
+    return {
+        "operaciones": len(latencias),
+        "errores": sum(parcial[1] for parcial in parciales),
+        "duracion_s": round(duracion, 4),
+        "throughput_ops_s": round(len(latencias) / duracion, 2) if duracion else 0.0,
+        "latencia_ms": {
+            "media": round(sum(latencias) / len(latencias) * 1000, 4) if latencias else 0.0,
+            "p50": round(percentil(latencias, 50) * 1000, 4),
+            "p95": round(percentil(latencias, 95) * 1000, 4),
+            "p99": round(percentil(latencias, 99) * 1000, 4),
+            "max": round(latencias[-1] * 1000, 4) if latencias else 0.0,
+        },
+    }
+
+
+def operaciones(repo: ProductoRepository, ids: List[int], creados: List[int]) -> Dict[str, Callable[[random.Random], bool]]:
+    """Define las operaciones a medir sobre el catálogo sembrado."""
+    def point_lookup(rnd):
+        return repo.get_by_id(rnd.choice(ids)) is not None
+
+    def batch_lookup(rnd):
+        return bool(repo.get_by_ids(rnd.sample(ids, min(50, len(ids)))))
+
+    def full_scan(rnd):
+        for _ in repo.iter_all(batch_size=1000):
+            pass
+        return True
+
+    def page(rnd):
+        return bool(repo.get_page(rnd.choice(ids) - 1, 20))
+
+    def search(rnd):
+        return bool(repo.search_by_name(f"{rnd.choice(CATEGORIAS)} {rnd.choice(MARCAS)}", 20))
+
+    def low_stock(rnd):
+        repo.get_by_low_stock()
+        return True
+
+    def insert(rnd):
+        producto = repo.create({"nombre": f"Bench {rnd.random():.8f}", "precio": round(rnd.uniform(5, 2500), 2), "stock": rnd.randint(0, 500)})
+        if producto:
+            creados.append(producto['id'])
+        return producto is not None
+
+    def patch(rnd):
+        return repo.patch(rnd.choice(ids), stock=rnd.randint(0, 500)) is not None
+
+    def update(rnd):
+        id_producto = rnd.choice(ids)
+        datos = {"nombre": f"Bench actualizado {id_producto}", "precio": round(rnd.uniform(5, 2500), 2), "stock": rnd.randint(0, 500)}
+        return repo.update(id_producto, datos) is not None
+
+    return {
+        "point_lookup": point_lookup,
+        "batch_lookup": batch_lookup,
+        "full_scan": full_scan,
+        "page": page,
+        "search": search,
+        "low_stock": low_stock,
+        "insert": insert,
+        "update": update,
+        "patch": patch,
+    }
+
+
+def crear_repositorio(backend: str, ruta_sqlite: str | None, monitor: MonitorConsultas | None = None,
+                      base_datos: str | None = None) -> ProductoRepository:
+    """Crea el repositorio a medir (con PostgreSQL, sobre la base de datos `base_datos`)."""
+    if backend == "sqlite":
+        from sqlite_repository import SqliteProductoRepository
+        return SqliteProductoRepository(ruta_sqlite, monitor=monitor)
+    from postgres_repository import PostgresProductoRepository
+    return PostgresProductoRepository(minconn=1, maxconn=int(os.getenv("DB_POOL_MAX", "10")), monitor=monitor,
+                                      base_datos=base_datos)
+
+
+def ejecutar(args) -> Dict[str, Any]:
+    """Ejecuta el benchmark completo para cada tamaño de catálogo y nivel de concurrencia."""
+    resultados = []
+    for filas in args.filas:
+        directorio = tempfile.mkdtemp(prefix="bench_") if args.backend == "sqlite" else None
+        ruta_sqlite = os.path.join(directorio, "bench.db") if directorio else None
+        metricas = Metricas() if args.instrumentar else None
+        backend = crear_repositorio(args.backend, ruta_sqlite, MonitorConsultas(None, metricas) if metricas else None,
+                                    args.base_datos)
+        repo = InstrumentedProductoRepository(backend, metricas) if metricas else backend
+        ids: List[int] = []
+        creados: List[int] = []
+        try:
+            if backend.get_page(0, 1):
+                raise RuntimeError(f"La tabla de productos de '{args.base_datos}' no está vacía; "
+                                   "el benchmark necesita una base de datos dedicada.")
+            print(f"Sembrando {filas} productos en {args.backend}...", file=sys.stderr)
+            inicio = time.perf_counter()
+            sembrar(repo, filas, args.semilla, ids)
+            resultados.append({"filas": filas, "hilos": 1, "operacion": "seed", "operaciones": filas,
+                               "duracion_s": round(time.perf_counter() - inicio, 4)})
+            medibles = [(nombre, operacion) for nombre, operacion in operaciones(repo, ids, creados).items()
+                        if nombre in args.operaciones]
+            lecturas = [(nombre, operacion) for nombre, operacion in medibles if nombre not in ESCRITURAS]
+            escrituras = [(nombre, operacion) for nombre, operacion in medibles if nombre in ESCRITURAS]
+            for fase in (lecturas, escrituras):
+                for hilos in args.hilos:
+                    for nombre, operacion in fase:
+                        repeticiones = args.escaneos if nombre == "full_scan" else args.repeticiones
+                        print(f"  {nombre} con {hilos} hilo(s)...", file=sys.stderr)
+                        medicion = medir(operacion, repeticiones, hilos, args.semilla)
+                        resultados.append({"filas": filas, "hilos": hilos, "operacion": nombre, **medicion})
+        finally:
+            if args.backend == "postgres" and (ids or creados):
+                backend.delete_many(ids + creados)
+            backend.close()
+            if directorio:
+                shutil.rmtree(directorio, ignore_errors=True)
+    return {
+        "backend": args.backend,
+        "semilla": args.semilla,
+        "instrumentado": args.instrumentar,
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "resultados": resultados,
+    }
+
+
+def main():
+    """Punto de entrada del benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark de las operaciones de ProductoRepository.")
+    parser.add_argument("--backend", choices=["sqlite", "postgres"], default="sqlite")
+    parser.add_argument("--filas", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Tamaños de catálogo a sembrar (por ejemplo 1000 100000 1000000)")
+    parser.add_argument("--hilos", type=int, nargs="+", default=[1, 8], help="Niveles de concurrencia")
+    parser.add_argument("--repeticiones", type=int, default=2000, help="Llamadas por operación puntual")
+    parser.add_argument("--escaneos", type=int, default=5, help="Recorridos completos de la tabla por medición")
+    parser.add_argument("--operaciones", nargs="+", default=["point_lookup", "batch_lookup", "full_scan", "page", "search", "low_stock",
+                                 "insert", "update", "patch"],
+                        help="Operaciones a medir")
+    parser.add_argument("--semilla", type=int, default=42, help="Semilla para datos y consultas reproducibles")
+    parser.add_argument("--instrumentar", action="store_true",
+                        help="Mide con el repositorio instrumentado (métricas por operación y por sentencia SQL)")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto, salida estándar)")
+    parser.add_argument("--base-datos", default=os.getenv("BENCH_DB_NAME"),
+                        help="Base de datos PostgreSQL dedicada al benchmark (por defecto, BENCH_DB_NAME)")
+    args = parser.parse_args()
+    if args.backend == "postgres":
+        if not args.base_datos:
+            parser.error("con --backend postgres hay que indicar una base de datos dedicada (--base-datos o BENCH_DB_NAME)")
+        if args.base_datos == os.getenv("DB_NAME", "hardware_shop_db"):
+            parser.error(f"'{args.base_datos}' es la base de datos de la aplicación; use una dedicada al benchmark")
+
+    # Los logs INFO de cada operación distorsionarían las mediciones.
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        informe = ejecutar(args)
+    except (ConnectionError, RuntimeError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    texto = json.dumps(informe, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            archivo.write(texto + "\n")
+        print(f"✅ Resultados escritos en {args.salida}", file=sys.stderr)
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
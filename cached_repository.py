@@ -0,0 +1,278 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+from producto import Producto
+from repositorio import ProductoRepository
+
+# La configuración del logger se realiza en el punto de entrada de la aplicación (main.py)
+
+# Resultados distintos de `get_by_low_stock` y `get_inventory_summary` que se conservan (LRU);
+# la clave la eligen quienes llaman (umbral, límite, top), así que el número debe estar acotado.
+MAX_CONSULTAS = 64
+
+class CachedProductoRepository(ProductoRepository):
+    """
+    Decorador de repositorio con caché de lectura en memoria.
+
+    Envuelve cualquier `ProductoRepository`: `get_by_id` se sirve desde una caché LRU acotada
+    con expiración por entrada, y el resultado de cada consulta `get_by_low_stock` se guarda
+    durante `ttl` segundos. Las escrituras hechas a través del decorador invalidan las entradas
+    afectadas; los cambios hechos por otros procesos se ven como mucho `ttl` segundos tarde.
+    """
+    def __init__(self, repo: ProductoRepository, max_entradas: int = 1024, ttl: float = 30.0, ttl_resumen: float = 5.0):
+        """
+        :param repo: Repositorio real al que se delegan las operaciones.
+        :param max_entradas: Número máximo de productos guardados en la caché de `get_by_id`.
+        :param ttl: Segundos que una entrada se considera válida (0 desactiva la caché de productos
+            y de stock bajo; el resumen sigue usando `ttl_resumen`).
+        :param ttl_resumen: Segundos que se reutiliza el resultado de `get_inventory_summary`
+            (0 lo desactiva).
+        """
+        if max_entradas < 1:
+            raise ValueError("max_entradas debe ser al menos 1.")
+        self.repo = repo
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.ttl_resumen = ttl_resumen
+        self._lock = threading.Lock()
+        # Los Producto son de sólo lectura, así que se guardan y devuelven sin copiarlos.
+        self._productos: "OrderedDict[int, tuple[float, Producto]]" = OrderedDict()
+        self._stock_bajo: "OrderedDict[tuple, tuple[float, tuple[Producto, ...]]]" = OrderedDict()
+        self._resumenes: "OrderedDict[tuple, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Se incrementa en cada escritura para no guardar lecturas que ya quedaron obsoletas.
+        self._generacion = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # --- Gestión interna de la caché ---
+
+    def _leer(self, id_producto: int) -> Producto | None:
+        """Devuelve el producto en caché, o None si no está o ha expirado."""
+        with self._lock:
+            entrada = self._productos.get(id_producto)
+            if entrada is not None and entrada[0] > time.monotonic():
+                self._productos.move_to_end(id_producto)
+                self.hits += 1
+                return entrada[1]
+            if entrada is not None:
+                del self._productos[id_producto]
+            self.misses += 1
+            return None
+
+    def _guardar(self, producto: Producto, generacion: int | None = None):
+        """Guarda (o refresca) un producto y descarta los menos usados si se supera el límite."""
+        with self._lock:
+            if generacion is not None and generacion != self._generacion:
+                return
+            self._productos[producto['id']] = (time.monotonic() + self.ttl, producto)
+            self._productos.move_to_end(producto['id'])
+            while len(self._productos) > self.max_entradas:
+                self._productos.popitem(last=False)
+                self.evictions += 1
+
+    def _leer_consulta(self, consultas: OrderedDict, clave: tuple):
+        """Devuelve el resultado guardado de una consulta agregada, o None si no está o ha expirado (con `_lock` tomado)."""
+        entrada = consultas.get(clave)
+        if entrada is not None and entrada[0] > time.monotonic():
+            consultas.move_to_end(clave)
+            self.hits += 1
+            return entrada[1]
+        if entrada is not None:
+            del consultas[clave]
+        self.misses += 1
+        return None
+
+    def _guardar_consulta(self, consultas: OrderedDict, clave: tuple, valor: Any, ttl: float):
+        """Guarda el resultado de una consulta agregada, descartando los expirados y los menos usados (con `_lock` tomado)."""
+        ahora = time.monotonic()
+        for otra in [c for c, (expira, _) in consultas.items() if expira <= ahora]:
+            del consultas[otra]
+        consultas[clave] = (ahora + ttl, valor)
+        consultas.move_to_end(clave)
+        while len(consultas) > MAX_CONSULTAS:
+            consultas.popitem(last=False)
+
+    def _invalidar(self, ids: Iterable[int] = ()):
+        """Elimina de la caché los productos indicados y los resultados agregados (stock bajo, resumen)."""
+        with self._lock:
+            for id_producto in ids:
+                self._productos.pop(id_producto, None)
+            self._stock_bajo.clear()
+            self._resumenes.clear()
+            self._generacion += 1
+
+    def limpiar(self):
+        """Vacía la caché por completo (los contadores se conservan)."""
+        with self._lock:
+            self._productos.clear()
+            self._stock_bajo.clear()
+            self._resumenes.clear()
+            self._generacion += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Devuelve los contadores de aciertos, fallos y expulsiones de la caché."""
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / consultas if consultas else 0.0,
+                "entradas": len(self._productos),
+                "max_entradas": self.max_entradas,
+            }
+
+    # --- Operaciones del repositorio ---
+
+    def get_all(self) -> List[Producto]:
+        """Obtiene todos los productos directamente del repositorio (no se cachea)."""
+        return self.repo.get_all()
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[Producto]:
+        """Recorre todos los productos directamente del repositorio (no se cachea)."""
+        return self.repo.iter_all(batch_size)
+
+    def get_page(self, after_id: int = 0, limit: int = 20) -> List[Producto]:
+        """Obtiene una página de productos directamente del repositorio (no se cachea)."""
+        return self.repo.get_page(after_id, limit)
+
+    def search_by_name(self, termino: str, limit: int = 20) -> List[Producto]:
+        """Busca productos por nombre directamente en el repositorio (no se cachea)."""
+        return self.repo.search_by_name(termino, limit)
+
+    def get_by_id(self, id_producto: int) -> Producto | None:
+        """Obtiene un producto desde la caché o, si no está, desde el repositorio."""
+        if self.ttl <= 0:
+            return self.repo.get_by_id(id_producto)
+        producto = self._leer(id_producto)
+        if producto is not None:
+            return producto
+        generacion = self._generacion
+        producto = self.repo.get_by_id(id_producto)
+        if producto:
+            self._guardar(producto, generacion)
+        return producto
+
+    def get_by_ids(self, ids: Iterable[int]) -> List[Producto]:
+        """Obtiene varios productos: los que están en caché se sirven de ella y el resto en una sola consulta."""
+        if self.ttl <= 0:
+            return self.repo.get_by_ids(ids)
+        encontrados = {}
+        faltantes = []
+        for id_producto in dict.fromkeys(ids):
+            producto = self._leer(id_producto)
+            if producto is not None:
+                encontrados[id_producto] = producto
+            else:
+                faltantes.append(id_producto)
+        if faltantes:
+            generacion = self._generacion
+            for producto in self.repo.get_by_ids(faltantes):
+                self._guardar(producto, generacion)
+                encontrados[producto['id']] = producto
+        return [encontrados[id_producto] for id_producto in sorted(encontrados)]
+
+    def create(self, data: Dict[str, Any]) -> Producto | None:
+        """Crea un producto y lo deja en caché."""
+        producto = self.repo.create(data)
+        self._invalidar()
+        if producto and self.ttl > 0:
+            self._guardar(producto)
+        return producto
+
+    # Tras modificar un producto su entrada sólo se invalida, no se vuelve a guardar: dos escrituras
+    # concurrentes pueden terminar en orden inverso y la más antigua quedaría en caché `ttl` segundos.
+    # La siguiente lectura la trae de nuevo del repositorio.
+
+    def update(self, id_producto: int, data: Dict[str, Any]) -> Producto | None:
+        """Actualiza un producto e invalida su entrada en caché."""
+        try:
+            return self.repo.update(id_producto, data)
+        finally:
+            self._invalidar([id_producto])
+
+    def patch(self, id_producto: int, version_esperada: int | None = None, **campos) -> Producto | None:
+        """Modifica un producto e invalida su entrada en caché (también si hubo conflicto de versión)."""
+        try:
+            return self.repo.patch(id_producto, version_esperada, **campos)
+        finally:
+            self._invalidar([id_producto])
+
+    def delete(self, id_producto: int) -> bool:
+        """Elimina un producto y su entrada en caché."""
+        eliminado = self.repo.delete(id_producto)
+        self._invalidar([id_producto])
+        return eliminado
+
+    def create_many(self, data: Iterable[Dict[str, Any]]) -> List[int]:
+        """Crea varios productos e invalida el resultado de stock bajo."""
+        ids = self.repo.create_many(data)
+        self._invalidar()
+        return ids
+
+    def update_many(self, data: Iterable[Dict[str, Any]]) -> int:
+        """Actualiza varios productos e invalida sus entradas en caché."""
+        data = list(data)
+        actualizados = self.repo.update_many(data)
+        self._invalidar(d['id'] for d in data)
+        return actualizados
+
+    def delete_many(self, ids: Iterable[int]) -> int:
+        """Elimina varios productos e invalida sus entradas en caché."""
+        ids = list(ids)
+        eliminados = self.repo.delete_many(ids)
+        self._invalidar(ids)
+        return eliminados
+
+    def get_by_low_stock(self, umbral: int | None = None, limite: int | None = None) -> List[Producto]:
+        """Obtiene los productos con stock bajo, reutilizando el último resultado de la misma consulta mientras no expire."""
+        if self.ttl <= 0:
+            return self.repo.get_by_low_stock(umbral, limite)
+        clave = (umbral, limite)
+        with self._lock:
+            guardado = self._leer_consulta(self._stock_bajo, clave)
+            if guardado is not None:
+                return list(guardado)
+            generacion = self._generacion
+        productos = self.repo.get_by_low_stock(umbral, limite)
+        with self._lock:
+            if generacion == self._generacion:
+                self._guardar_consulta(self._stock_bajo, clave, tuple(productos), self.ttl)
+        return productos
+
+    def get_inventory_summary(self, umbral: int | None = None, top: int = 5) -> Dict[str, Any]:
+        """Obtiene el resumen del inventario, reutilizándolo durante `ttl_resumen` segundos."""
+        if self.ttl_resumen <= 0:
+            return self.repo.get_inventory_summary(umbral, top)
+        clave = (umbral, top)
+        with self._lock:
+            guardado = self._leer_consulta(self._resumenes, clave)
+            if guardado is not None:
+                return dict(guardado)
+            generacion = self._generacion
+        resumen = self.repo.get_inventory_summary(umbral, top)
+        with self._lock:
+            if resumen and generacion == self._generacion:
+                self._guardar_consulta(self._resumenes, clave, dict(resumen), self.ttl_resumen)
+        return resumen
+
+    def adjust_stock(self, id_producto: int, delta: int) -> Producto | None:
+        """Ajusta el stock de un producto e invalida su entrada en caché."""
+        try:
+            return self.repo.adjust_stock(id_producto, delta)
+        finally:
+            self._invalidar([id_producto])
+
+    def apply_order(self, lineas: Iterable[Tuple[int, int]]) -> List[Producto]:
+        """Aplica un pedido e invalida en caché los productos afectados."""
+        lineas = list(lineas)
+        try:
+            return self.repo.apply_order(lineas)
+        finally:
+            self._invalidar(id_producto for id_producto, _ in lineas)
+
+    def close(self):
+        """Cierra el repositorio envuelto (la caché no mantiene recursos propios)."""
+        self.repo.close()
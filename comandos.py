@@ -0,0 +1,281 @@
+import argparse
+import contextlib
+import json
+import shlex
+import sys
+from collections.abc import Mapping
+from typing import Any, Callable, Iterable, List, TextIO
+
+from exportador import FORMATOS, DIRECTORIO_EXPORTACION, serializar_json, exportar_inventario, ruta_exportacion
+from importador import validar_producto, importar_archivo
+from repositorio import ConflictoDeVersion, ProductoRepository, StockInsuficiente
+
+# Modo no interactivo de main.py: cada subcomando realiza una operación y escribe el resultado
+# en la salida estándar como JSON (un objeto por línea); los errores van a la salida de error.
+# `batch` lee muchas operaciones de la entrada estándar y las ejecuta con una sola conexión.
+#
+#   python main.py add --nombre "SSD 1TB" --precio 89.9 --stock 20
+#   python main.py get 1 2 3
+#   python main.py low-stock --limite 50
+#   python main.py order 1:-2 7:-1
+#   printf 'get 1\nupdate 1 --stock 7\n' | python main.py batch
+
+
+class ErrorDeComando(Exception):
+    """La operación no se pudo completar; el mensaje se muestra al usuario."""
+    pass
+
+
+def _escribir(salida: TextIO, valor: Any):
+    salida.write(json.dumps(dict(valor) if isinstance(valor, Mapping) else valor,
+                            ensure_ascii=False, default=serializar_json) + "\n")
+
+
+def _escribir_productos(salida: TextIO, productos: Iterable) -> int:
+    total = 0
+    for producto in productos:
+        _escribir(salida, producto)
+        total += 1
+    return total
+
+
+def _no_negativo(texto: str) -> int:
+    valor = int(texto)
+    if valor < 0:
+        raise argparse.ArgumentTypeError("debe ser un entero no negativo")
+    return valor
+
+
+def _precio(texto: str) -> float:
+    valor = float(texto)
+    if valor < 0:
+        raise argparse.ArgumentTypeError("debe ser un número no negativo")
+    return valor
+
+
+def _linea_pedido(texto: str) -> tuple:
+    id_producto, separador, delta = texto.partition(":")
+    if not separador:
+        raise argparse.ArgumentTypeError("use el formato ID:DELTA")
+    return int(id_producto), int(delta)
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    """Construye el parser de los subcomandos (también se usa para cada línea de `batch`)."""
+    parser = argparse.ArgumentParser(prog="main.py",
+                                     description="Gestión del inventario. Sin subcomando se abre el menú interactivo.")
+    subcomandos = parser.add_subparsers(dest="comando", metavar="COMANDO")
+
+    add = subcomandos.add_parser("add", help="Crea un producto")
+    add.add_argument("--nombre", required=True)
+    add.add_argument("--precio", type=_precio, required=True)
+    add.add_argument("--stock", type=_no_negativo, required=True)
+    add.add_argument("--punto-reorden", type=_no_negativo)
+
+    get = subcomandos.add_parser("get", help="Muestra uno o varios productos por ID")
+    get.add_argument("ids", type=int, nargs="+", metavar="ID")
+
+    update = subcomandos.add_parser("update", help="Modifica los campos indicados de un producto")
+    update.add_argument("id", type=int)
+    update.add_argument("--nombre")
+    update.add_argument("--precio", type=_precio)
+    update.add_argument("--stock", type=_no_negativo)
+    update.add_argument("--punto-reorden", type=_no_negativo)
+    update.add_argument("--version", type=int, help="Falla si el producto ya no está en esta versión")
+
+    delete = subcomandos.add_parser("delete", help="Elimina uno o varios productos por ID")
+    delete.add_argument("ids", type=int, nargs="+", metavar="ID")
+
+    adjust = subcomandos.add_parser("adjust", help="Suma DELTA (positivo o negativo) al stock de un producto")
+    adjust.add_argument("id", type=int)
+    adjust.add_argument("delta", type=int)
+
+    order = subcomandos.add_parser("order", help="Aplica un pedido de varias líneas en una sola transacción")
+    order.add_argument("lineas", type=_linea_pedido, nargs="+", metavar="ID:DELTA")
+
+    listar = subcomandos.add_parser("list", help="Lista productos por páginas, por prefijo de nombre o completos")
+    listar.add_argument("--after-id", type=int, default=0, help="Devuelve los productos con ID mayor que éste")
+    listar.add_argument("--limit", type=int, default=20)
+    listar.add_argument("--nombre", help="Sólo productos cuyo nombre empieza por este texto")
+    listar.add_argument("--todos", action="store_true", help="Recorre todo el inventario (ignora --limit)")
+
+    low_stock = subcomandos.add_parser("low-stock", help="Lista los productos con stock bajo")
+    low_stock.add_argument("--umbral", type=_no_negativo)
+    low_stock.add_argument("--limite", type=int)
+
+    summary = subcomandos.add_parser("summary", help="Muestra el resumen del inventario")
+    summary.add_argument("--umbral", type=_no_negativo)
+    summary.add_argument("--top", type=_no_negativo, default=5)
+
+    export = subcomandos.add_parser("export", help="Exporta el inventario a un archivo")
+    export.add_argument("nombre", help="Nombre del archivo, sin extensión")
+    export.add_argument("--formato", choices=FORMATOS, default="txt")
+    export.add_argument("--gzip", action="store_true")
+    export.add_argument("--directorio", default=DIRECTORIO_EXPORTACION)
+
+    importar = subcomandos.add_parser("import", help="Importa productos desde un archivo CSV o JSONL")
+    importar.add_argument("archivo")
+    importar.add_argument("--lote", type=int, default=5000)
+
+    batch = subcomandos.add_parser("batch", help="Ejecuta los comandos leídos de la entrada estándar, uno por línea")
+    batch.add_argument("--detener", action="store_true", help="Se detiene en el primer comando que falle")
+    return parser
+
+
+def ejecutar(args: argparse.Namespace, repo: ProductoRepository, salida: TextIO = sys.stdout):
+    """Ejecuta un subcomando ya analizado. Lanza ErrorDeComando si la operación falla."""
+    comando = args.comando
+    if comando == "add":
+        try:
+            datos = validar_producto({"nombre": args.nombre, "precio": args.precio, "stock": args.stock,
+                              "punto_reorden": args.punto_reorden})
+        except ValueError as e:
+            raise ErrorDeComando(str(e))
+        producto = repo.create(datos)
+        if producto is None:
+            raise ErrorDeComando("no se pudo crear el producto")
+        _escribir(salida, producto)
+
+    elif comando == "get":
+        productos = repo.get_by_ids(args.ids) if len(args.ids) > 1 else [p for p in [repo.get_by_id(args.ids[0])] if p]
+        _escribir_productos(salida, productos)
+        faltantes = sorted(set(args.ids) - {p['id'] for p in productos})
+        if faltantes:
+            raise ErrorDeComando(f"productos no encontrados: {', '.join(map(str, faltantes))}")
+
+    elif comando == "update":
+        campos = {campo: valor for campo, valor in (("nombre", args.nombre), ("precio", args.precio),
+                                                     ("stock", args.stock), ("punto_reorden", args.punto_reorden))
+                  if valor is not None}
+        if "nombre" in campos and not campos["nombre"].strip():
+            raise ErrorDeComando("el nombre no puede estar vacío")
+        if not campos:
+            raise ErrorDeComando("no se indicó ningún campo a modificar")
+        try:
+            producto = repo.patch(args.id, version_esperada=args.version, **campos)
+        except ConflictoDeVersion:
+            raise ErrorDeComando(f"el producto {args.id} ya no está en la versión {args.version}")
+        if producto is None:
+            raise ErrorDeComando(f"producto no encontrado o no actualizado: {args.id}")
+        _escribir(salida, producto)
+
+    elif comando == "delete":
+        eliminados = repo.delete_many(args.ids) if len(args.ids) > 1 else int(repo.delete(args.ids[0]))
+        _escribir(salida, {"eliminados": eliminados})
+        if eliminados < len(set(args.ids)):
+            raise ErrorDeComando(f"se eliminaron {eliminados} de {len(set(args.ids))} productos")
+
+    elif comando == "adjust":
+        try:
+            producto = repo.adjust_stock(args.id, args.delta)
+        except StockInsuficiente:
+            raise ErrorDeComando(f"stock insuficiente en el producto {args.id}")
+        if producto is None:
+            raise ErrorDeComando(f"producto no encontrado o no actualizado: {args.id}")
+        _escribir(salida, producto)
+
+    elif comando == "order":
+        try:
+            productos = repo.apply_order(args.lineas)
+        except (StockInsuficiente, ValueError) as e:
+            raise ErrorDeComando(str(e))
+        if not productos:
+            raise ErrorDeComando("no se pudo aplicar el pedido")
+        _escribir_productos(salida, productos)
+
+    elif comando == "list":
+        if args.todos:
+            try:
+                _escribir_productos(salida, repo.iter_all())
+            except Exception as e:
+                raise ErrorDeComando(f"error al recorrer el inventario: {e}")
+        elif args.nombre:
+            _escribir_productos(salida, repo.search_by_name(args.nombre, args.limit))
+        else:
+            _escribir_productos(salida, repo.get_page(after_id=args.after_id, limit=args.limit))
+
+    elif comando == "low-stock":
+        _escribir_productos(salida, repo.get_by_low_stock(umbral=args.umbral, limite=args.limite))
+
+    elif comando == "summary":
+        resumen = repo.get_inventory_summary(args.umbral, args.top)
+        if not resumen:
+            raise ErrorDeComando("no se pudo calcular el resumen del inventario")
+        _escribir(salida, resumen)
+
+    elif comando == "export":
+        ruta = ruta_exportacion(args.nombre, args.formato, args.gzip, args.directorio)
+        try:
+            total = exportar_inventario(repo, ruta, args.formato, args.gzip)
+        except Exception as e:
+            raise ErrorDeComando(f"error al exportar: {e}")
+        _escribir(salida, {"ruta": ruta, "productos": total})
+
+    elif comando == "import":
+        rechazados: List[int] = []
+        try:
+            creados = importar_archivo(repo, args.archivo, args.lote, rechazados)
+        except (OSError, ValueError) as e:
+            raise ErrorDeComando(f"error al importar: {e}")
+        _escribir(salida, {"archivo": args.archivo, "creados": creados, "rechazados": len(rechazados)})
+        if rechazados:
+            raise ErrorDeComando(f"{len(rechazados)} filas rechazadas (primera en la línea {rechazados[0]})")
+
+    else:
+        raise ErrorDeComando(f"comando no soportado: {comando}")
+
+
+def ejecutar_lote(entrada: TextIO, obtener_repositorio: Callable[[], ProductoRepository],
+                  detener: bool = False, salida: TextIO = sys.stdout) -> int:
+    """
+    Ejecuta los comandos de `entrada`, uno por línea con la misma sintaxis que en la línea de
+    comandos (se ignoran las líneas vacías y las que empiezan por '#').
+
+    Todas las operaciones comparten el mismo repositorio y, por tanto, la misma conexión.
+    Devuelve cuántos comandos fallaron.
+    """
+    parser = crear_parser()
+    fallidos = 0
+    for numero, linea in enumerate(entrada, start=1):
+        linea = linea.strip()
+        if not linea or linea.startswith("#"):
+            continue
+        try:
+            # La ayuda y los errores de argparse van a la salida de error: la salida estándar
+            # sólo lleva resultados en JSON.
+            with contextlib.redirect_stdout(sys.stderr):
+                args = parser.parse_args(shlex.split(linea))
+        except SystemExit as e:
+            # argparse ya mostró la ayuda (código 0) o el error de sintaxis.
+            if e.code:
+                print(f"❌ Línea {numero}: comando no válido", file=sys.stderr)
+                fallidos += 1
+        except ValueError as e:
+            print(f"❌ Línea {numero}: {e}", file=sys.stderr)
+            fallidos += 1
+        else:
+            # Un fallo de conexión al crear el repositorio (SystemExit) detiene todo el lote.
+            try:
+                if args.comando in (None, "batch"):
+                    raise ErrorDeComando("se esperaba un subcomando distinto de 'batch'")
+                ejecutar(args, obtener_repositorio(), salida)
+            except (ErrorDeComando, ValueError) as e:
+                print(f"❌ Línea {numero}: {e}", file=sys.stderr)
+                fallidos += 1
+        salida.flush()
+        if fallidos and detener:
+            break
+    return fallidos
+
+
+def main(argv: List[str], obtener_repositorio: Callable[[], ProductoRepository]) -> int:
+    """Analiza `argv`, ejecuta el subcomando y devuelve el código de salida del proceso."""
+    args = crear_parser().parse_args(argv)
+    if args.comando == "batch":
+        return 1 if ejecutar_lote(sys.stdin, obtener_repositorio, args.detener) else 0
+    try:
+        ejecutar(args, obtener_repositorio())
+    except ErrorDeComando as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    return 0
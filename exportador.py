@@ -0,0 +1,138 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+from decimal import Decimal
+from typing import Any, Dict, TextIO
+
+from repositorio import ProductoRepository
+
+# La configuración del logger se realiza en el punto de entrada de la aplicación (main.py)
+
+FORMATOS = ("txt", "csv", "jsonl")
+DIRECTORIO_EXPORTACION = "exports-txt"
+COLUMNAS = ("id", "nombre", "precio", "stock", "punto_reorden", "version")
+
+
+def ruta_exportacion(nombre: str, formato: str = "txt", comprimir: bool = False,
+                     directorio: str = DIRECTORIO_EXPORTACION) -> str:
+    """Construye la ruta del archivo de exportación con la extensión que corresponde al formato."""
+    return os.path.join(directorio, f"{nombre}.{formato}" + (".gz" if comprimir else ""))
+
+
+def _repositorio_con_copy(repo: ProductoRepository):
+    """Busca, atravesando decoradores como CachedProductoRepository, un repositorio que soporte COPY."""
+    while repo is not None:
+        if hasattr(repo, "copy_to"):
+            return repo
+        repo = getattr(repo, "repo", None)
+    return None
+
+
+def serializar_json(valor: Any):
+    """Función `default` de json.dumps: serializa los precios NUMERIC (Decimal) como números JSON."""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def _escribir_filas(repo: ProductoRepository, salida: TextIO, formato: str) -> int:
+    """Formatea en Python las filas de `iter_all` (para repositorios sin COPY). Devuelve cuántas escribió."""
+    total = 0
+    if formato == "csv":
+        escritor = csv.writer(salida, lineterminator="\n")
+        escritor.writerow(COLUMNAS)
+        for p in repo.iter_all():
+            escritor.writerow([p.get(columna) for columna in COLUMNAS])
+            total += 1
+    elif formato == "jsonl":
+        for p in repo.iter_all():
+            fila: Dict[str, Any] = {columna: p.get(columna) for columna in COLUMNAS}
+            salida.write(json.dumps(fila, ensure_ascii=False, default=serializar_json) + "\n")
+            total += 1
+    else:
+        for p in repo.iter_all():
+            # Igual que la consulta COPY "txt": un salto de línea en el nombre no parte el producto en dos líneas.
+            nombre = p['nombre'].replace("\n", " ")
+            salida.write(f"ID: {p['id']} | {nombre} | Precio: ${p['precio']:.2f} | Stock: {p['stock']}\n")
+            total += 1
+    return total
+
+
+def exportar_inventario(repo: ProductoRepository, ruta: str, formato: str = "txt", comprimir: bool = False) -> int:
+    """
+    Exporta todo el inventario a `ruta` en formato "txt" (reporte), "csv" o "jsonl".
+
+    Con PostgreSQL las filas se generan en el servidor con `COPY ... TO STDOUT` y se escriben
+    directamente en el archivo; con otros repositorios se recorren con `iter_all`. En ambos casos
+    la memoria usada es constante. El archivo se escribe primero en un temporal del mismo
+    directorio y se renombra al terminar, así que nunca queda un export a medias en `ruta`.
+    Con `comprimir` la salida se escribe en gzip. Devuelve el número de productos exportados.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportación no soportado: '{formato}' (use {', '.join(FORMATOS)})")
+    directorio = os.path.dirname(ruta) or "."
+    os.makedirs(directorio, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix=".exportando-", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as crudo:
+            binario = gzip.GzipFile(fileobj=crudo, mode="wb") if comprimir else crudo
+            salida = io.TextIOWrapper(binario, encoding="utf-8", newline="")
+            if formato == "txt":
+                salida.write("REPORTE DE INVENTARIO\n")
+                salida.write("=" * 50 + "\n\n")
+            origen = _repositorio_con_copy(repo)
+            if origen is not None:
+                salida.flush()
+                total = origen.copy_to(salida, formato)
+            else:
+                total = _escribir_filas(repo, salida, formato)
+            salida.flush()
+            salida.detach()
+            if comprimir:
+                binario.close()
+            crudo.flush()
+            os.fsync(crudo.fileno())
+        # mkstemp crea el archivo sólo legible por el propietario; se dejan los permisos habituales.
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    logging.info("Inventario exportado a %s (%s productos, formato %s).", ruta, total, formato)
+    return total
+
+
+def main():
+    """Punto de entrada para exportar el inventario sin pasar por el menú interactivo."""
+    parser = argparse.ArgumentParser(description="Exporta el inventario completo a un archivo.")
+    parser.add_argument("nombre", help="Nombre del archivo, sin extensión")
+    parser.add_argument("--formato", choices=FORMATOS, default="txt")
+    parser.add_argument("--gzip", action="store_true", help="Comprime la salida con gzip")
+    parser.add_argument("--directorio", default=DIRECTORIO_EXPORTACION)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from main import crear_backend
+    try:
+        repo = crear_backend()
+    except (ConnectionError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    ruta = ruta_exportacion(args.nombre, args.formato, args.gzip, args.directorio)
+    try:
+        total = exportar_inventario(repo, ruta, args.formato, args.gzip)
+    except Exception as e:
+        print(f"❌ Error al exportar: {e}")
+        sys.exit(1)
+    print(f"✅ {total} productos exportados a {ruta}")
+
+
+if __name__ == "__main__":
+    main()
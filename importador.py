@@ -0,0 +1,136 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Tuple
+
+from repositorio import ProductoRepository
+
+# La configuración del logger se realiza en el punto de entrada de la aplicación (main.py)
+
+
+def _leer_filas(ruta: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Lee un archivo CSV (con encabezado) o JSONL fila por fila, según su extensión, y devuelve
+    pares (número de línea, fila). Las líneas JSONL se devuelven sin decodificar para que un error
+    en una de ellas sólo rechace esa fila.
+
+    Se admite la marca BOM de UTF-8 (habitual en los CSV exportados desde Excel); los bytes que no
+    son UTF-8 válido se conservan como sustitutos y la fila que los contiene se rechaza al validarla.
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension not in (".csv", ".jsonl", ".ndjson"):
+        raise ValueError(f"Formato de archivo no soportado: '{extension}' (use .csv o .jsonl)")
+    with open(ruta, newline="", encoding="utf-8-sig", errors="surrogateescape") as archivo:
+        if extension == ".csv":
+            lector = csv.DictReader(archivo)
+            for fila in lector:
+                yield lector.line_num, fila
+        else:
+            for numero, linea in enumerate(archivo, start=1):
+                if linea.strip():
+                    yield numero, linea
+
+
+def _a_diccionario(fila: Any) -> Dict[str, Any]:
+    """Decodifica una línea JSONL (las filas CSV ya son diccionarios) y comprueba que el texto es UTF-8 válido."""
+    if isinstance(fila, str):
+        try:
+            fila = json.loads(fila)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON no válido ({e.msg}, columna {e.colno})")
+        if not isinstance(fila, dict):
+            raise ValueError("la línea no es un objeto JSON")
+    for valor in fila.values():
+        if isinstance(valor, str):
+            try:
+                valor.encode("utf-8")
+            except UnicodeEncodeError:
+                raise ValueError("el texto no es UTF-8 válido")
+    return fila
+
+
+def validar_producto(fila: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte una fila leída al formato que espera el repositorio, o lanza ValueError."""
+    nombre = str(fila.get("nombre") or "").strip()
+    if not nombre:
+        raise ValueError("el nombre no puede estar vacío")
+    precio = float(fila["precio"])
+    stock = int(fila["stock"])
+    if precio < 0 or stock < 0:
+        raise ValueError("el precio y el stock deben ser valores positivos")
+    punto_reorden = fila.get("punto_reorden")
+    punto_reorden = int(punto_reorden) if punto_reorden not in (None, "") else None
+    if punto_reorden is not None and punto_reorden < 0:
+        raise ValueError("el punto de reorden no puede ser negativo")
+    return {"nombre": nombre, "precio": precio, "stock": stock, "punto_reorden": punto_reorden}
+
+
+def _productos_validos(ruta: str, rechazados: list) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Devuelve las filas válidas del archivo con su número de línea y anota el de las rechazadas."""
+    for numero, fila in _leer_filas(ruta):
+        try:
+            yield numero, validar_producto(_a_diccionario(fila))
+        except (KeyError, TypeError, ValueError) as e:
+            logging.warning("Línea %s de '%s' rechazada: %s", numero, ruta, e)
+            rechazados.append(numero)
+
+
+def importar_archivo(repo: ProductoRepository, ruta: str, tamano_lote: int = 5000,
+                     rechazados: List[int] | None = None) -> int:
+    """
+    Importa productos desde un archivo CSV o JSONL usando `create_many` por lotes.
+
+    El archivo se lee de forma incremental, así que sólo se mantiene en memoria un lote de
+    `tamano_lote` filas. Las filas no válidas y las de los lotes que no se pudieron insertar se
+    omiten y sus números de línea se añaden a `rechazados`. Devuelve el número de productos creados.
+    """
+    rechazados = [] if rechazados is None else rechazados
+    productos = _productos_validos(ruta, rechazados)
+    creados = 0
+    while True:
+        lote = list(islice(productos, tamano_lote))
+        if not lote:
+            break
+        ids = repo.create_many([producto for _, producto in lote])
+        if len(ids) != len(lote):
+            logging.error("No se pudo importar un lote de %s productos (líneas %s a %s) desde '%s'.",
+                          len(lote), lote[0][0], lote[-1][0], ruta)
+            rechazados.extend(numero for numero, _ in lote)
+        creados += len(ids)
+    logging.info("Importación de '%s' finalizada: %s creados, %s filas rechazadas.", ruta, creados, len(rechazados))
+    return creados
+
+
+def main():
+    """Punto de entrada para importar un catálogo desde la línea de comandos."""
+    from main import crear_backend
+
+    parser = argparse.ArgumentParser(description="Importa productos desde un archivo CSV o JSONL.")
+    parser.add_argument("archivo", help="Ruta del archivo .csv (columnas nombre,precio,stock[,punto_reorden]) o .jsonl")
+    parser.add_argument("--lote", type=int, default=5000, help="Filas por transacción (por defecto 5000)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        repo = crear_backend()
+    except (ConnectionError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    rechazados: List[int] = []
+    try:
+        creados = importar_archivo(repo, args.archivo, args.lote, rechazados)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error al importar: {e}")
+        sys.exit(1)
+    print(f"✅ {creados} productos importados desde {args.archivo}")
+    if rechazados:
+        print(f"⚠️ {len(rechazados)} filas rechazadas; los motivos se muestran en el log")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
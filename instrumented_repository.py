@@ -0,0 +1,130 @@
+import time
+from collections.abc import Mapping
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Tuple
+from metricas import Metricas, logger_lentas
+from producto import Producto
+from repositorio import ProductoRepository
+
+# La configuración del logger se realiza en el punto de entrada de la aplicación (main.py)
+
+def _contar_filas(resultado: Any) -> int:
+    """Filas devueltas (listas, productos, resúmenes) o modificadas (contadores de las operaciones masivas)."""
+    if isinstance(resultado, (list, tuple)):
+        return len(resultado)
+    if isinstance(resultado, Mapping):
+        return 1
+    if isinstance(resultado, int) and not isinstance(resultado, bool):
+        return resultado
+    return 0
+
+class InstrumentedProductoRepository(ProductoRepository):
+    """
+    Decorador de repositorio que mide cada llamada.
+
+    Envuelve cualquier `ProductoRepository` y registra en `metricas`, por método, el número de
+    llamadas, las que lanzaron una excepción, las filas devueltas y un histograma de latencia.
+    Las llamadas que tardan `umbral_lento` segundos o más se registran en el logger
+    "consultas_lentas" con sus argumentos. Para no pagar nada cuando no se necesita, basta con
+    no envolver el repositorio.
+    """
+    def __init__(self, repo: ProductoRepository, metricas: Metricas, umbral_lento: float | None = None):
+        """
+        :param repo: Repositorio real al que se delegan las operaciones.
+        :param metricas: Registro donde se acumulan las mediciones.
+        :param umbral_lento: Segundos a partir de los cuales una llamada se considera lenta
+            (None no registra ninguna).
+        """
+        self.repo = repo
+        self.metricas = metricas
+        self.umbral_lento = umbral_lento
+
+    def _medir(self, operacion: str, funcion: Callable, *args, **kwargs):
+        """Ejecuta `funcion` y registra su duración, sus filas y si lanzó una excepción."""
+        inicio = time.perf_counter()
+        resultado = None
+        error = False
+        try:
+            resultado = funcion(*args, **kwargs)
+            return resultado
+        except Exception:
+            error = True
+            raise
+        finally:
+            self._registrar(operacion, time.perf_counter() - inicio, _contar_filas(resultado), error, args, kwargs)
+
+    def _registrar(self, operacion: str, duracion: float, filas: int, error: bool, args: tuple, kwargs: dict):
+        self.metricas.registrar_operacion(operacion, duracion, filas, error)
+        if self.umbral_lento is not None and duracion >= self.umbral_lento:
+            argumentos = ", ".join([repr(a)[:80] for a in args] + [f"{k}={v!r}"[:80] for k, v in kwargs.items()])
+            logger_lentas.warning("Operación lenta (%.1f ms, %s filas): %s(%s)", duracion * 1000, filas, operacion, argumentos)
+
+    def estadisticas(self) -> Dict[str, Dict[str, Any]]:
+        """Devuelve el resumen por operación de las métricas registradas."""
+        return self.metricas.resumen()
+
+    def get_all(self) -> List[Producto]:
+        return self._medir("get_all", self.repo.get_all)
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[Producto]:
+        """Recorre los productos; la latencia registrada abarca el recorrido completo."""
+        inicio = time.perf_counter()
+        filas = 0
+        error = False
+        try:
+            for producto in self.repo.iter_all(batch_size):
+                filas += 1
+                yield producto
+        except Exception:
+            error = True
+            raise
+        finally:
+            self._registrar("iter_all", time.perf_counter() - inicio, filas, error, (batch_size,), {})
+
+    def get_page(self, after_id: int = 0, limit: int = 20) -> List[Producto]:
+        return self._medir("get_page", self.repo.get_page, after_id, limit)
+
+    def search_by_name(self, termino: str, limit: int = 20) -> List[Producto]:
+        return self._medir("search_by_name", self.repo.search_by_name, termino, limit)
+
+    def get_by_id(self, id_producto: int) -> Producto | None:
+        return self._medir("get_by_id", self.repo.get_by_id, id_producto)
+
+    def get_by_ids(self, ids: Iterable[int]) -> List[Producto]:
+        return self._medir("get_by_ids", self.repo.get_by_ids, ids)
+
+    def create(self, data: Dict[str, Any]) -> Producto | None:
+        return self._medir("create", self.repo.create, data)
+
+    def update(self, id_producto: int, data: Dict[str, Any]) -> Producto | None:
+        return self._medir("update", self.repo.update, id_producto, data)
+
+    def patch(self, id_producto: int, version_esperada: int | None = None, **campos) -> Producto | None:
+        return self._medir("patch", self.repo.patch, id_producto, version_esperada, **campos)
+
+    def delete(self, id_producto: int) -> bool:
+        return self._medir("delete", self.repo.delete, id_producto)
+
+    def create_many(self, data: Iterable[Dict[str, Any]]) -> List[int]:
+        return self._medir("create_many", self.repo.create_many, data)
+
+    def update_many(self, data: Iterable[Dict[str, Any]]) -> int:
+        return self._medir("update_many", self.repo.update_many, data)
+
+    def delete_many(self, ids: Iterable[int]) -> int:
+        return self._medir("delete_many", self.repo.delete_many, ids)
+
+    def get_by_low_stock(self, umbral: int | None = None, limite: int | None = None) -> List[Producto]:
+        return self._medir("get_by_low_stock", self.repo.get_by_low_stock, umbral, limite)
+
+    def get_inventory_summary(self, umbral: int | None = None, top: int = 5) -> Dict[str, Any]:
+        return self._medir("get_inventory_summary", self.repo.get_inventory_summary, umbral, top)
+
+    def adjust_stock(self, id_producto: int, delta: int) -> Producto | None:
+        return self._medir("adjust_stock", self.repo.adjust_stock, id_producto, delta)
+
+    def apply_order(self, lineas: Iterable[Tuple[int, int]]) -> List[Producto]:
+        return self._medir("apply_order", self.repo.apply_order, lineas)
+
+    def close(self):
+        """Cierra el repositorio envuelto."""
+        self.repo.close()
@@ -1,33 +1,139 @@
-from postgres_repository import PostgresProductoRepository
+from cached_repository import CachedProductoRepository
+from instrumented_repository import InstrumentedProductoRepository
+from metricas import Metricas, MonitorConsultas
+from repositorio import UMBRAL_STOCK_BAJO, ConflictoDeVersion
+from exportador import FORMATOS, exportar_inventario, ruta_exportacion
+from registro import configurar_logging
+from reporte import imprimir_resumen
+import comandos
 import os
 import logging
 import sys
-
-# --- Configuración del Logger ---
-# Configura el logger para que escriba en un archivo y también en la consola.
-log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-log_file_handler = logging.FileHandler('operaciones.log', encoding='utf-8')
-log_file_handler.setFormatter(log_formatter)
-log_console_handler = logging.StreamHandler(sys.stdout)
-log_console_handler.setFormatter(log_formatter)
+from typing import List
 
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
-logger.addHandler(log_file_handler)
-logger.addHandler(log_console_handler)
+
+def configurar_logging_desde_entorno(consola: bool = True):
+    """Configura el logging (cola con escritura en segundo plano) según las variables LOG_*."""
+    configurar_logging(
+        archivo=os.getenv("LOG_ARCHIVO", "operaciones.log"),
+        nivel=os.getenv("LOG_NIVEL", "INFO").upper(),
+        formato=os.getenv("LOG_FORMATO", "texto"),
+        rotacion=os.getenv("LOG_ROTACION", "tamano"),
+        max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        copias=int(os.getenv("LOG_COPIAS", "5")),
+        consola=consola,
+    )
+
+def crear_backend(monitor: MonitorConsultas | None = None):
+    """
+    Crea el repositorio de base de datos indicado en la variable de entorno DB_BACKEND.
+
+    Valores admitidos: "postgres" (por defecto) y "sqlite" (usa el archivo de SQLITE_PATH).
+    Con `monitor`, el backend cronometra cada sentencia SQL.
+    """
+    backend = os.getenv("DB_BACKEND", "postgres").strip().lower()
+    if backend == "sqlite":
+        from sqlite_repository import SqliteProductoRepository
+        return SqliteProductoRepository(os.getenv("SQLITE_PATH", "hardware_shop.db"), monitor=monitor)
+    if backend == "postgres":
+        from postgres_repository import PostgresProductoRepository
+        return PostgresProductoRepository(
+            minconn=int(os.getenv("DB_POOL_MIN", "1")),
+            maxconn=int(os.getenv("DB_POOL_MAX", "10")),
+            monitor=monitor,
+        )
+    raise ValueError(f"DB_BACKEND no reconocido: '{backend}' (use 'postgres' o 'sqlite').")
+
+def configurar_metricas():
+    """
+    Prepara la instrumentación según las variables de entorno.
+
+    METRICAS_PUERTO publica las métricas por HTTP, METRICAS_ARCHIVO las vuelca a un archivo y
+    CONSULTA_LENTA_MS registra las sentencias y operaciones que superen ese tiempo. Si ninguna
+    está definida devuelve (None, None) y el repositorio no se instrumenta.
+    """
+    puerto = os.getenv("METRICAS_PUERTO", "").strip()
+    archivo = os.getenv("METRICAS_ARCHIVO", "").strip()
+    lenta_ms = os.getenv("CONSULTA_LENTA_MS", "").strip()
+    if not (puerto or archivo or lenta_ms):
+        return None, None
+    metricas = Metricas()
+    monitor = MonitorConsultas(float(lenta_ms) / 1000 if lenta_ms else None, metricas)
+    if puerto:
+        metricas.servir_http(int(puerto), os.getenv("METRICAS_HOST", "127.0.0.1"))
+    return metricas, monitor
+
+def volcar_metricas():
+    """Escribe las métricas en METRICAS_ARCHIVO, si está configurado."""
+    archivo = os.getenv("METRICAS_ARCHIVO", "").strip()
+    if metricas is not None and archivo:
+        try:
+            metricas.escribir_prometheus(archivo)
+        except OSError as e:
+            logger.error("No se pudieron escribir las métricas en %s: %s", archivo, e)
 
 def inicializar_repositorio():
     """Inicializa el repositorio de productos y maneja errores de conexión."""
     try:
-        return PostgresProductoRepository()
+        repositorio = crear_backend(monitor)
+        cache_ttl = float(os.getenv("CACHE_TTL", "0"))
+        ttl_resumen = float(os.getenv("CACHE_TTL_RESUMEN", "5"))
+        # El resumen se cachea aunque la caché de productos esté desactivada (CACHE_TTL=0).
+        if cache_ttl > 0 or ttl_resumen > 0:
+            repositorio = CachedProductoRepository(
+                repositorio,
+                max_entradas=int(os.getenv("CACHE_MAX_ENTRADAS", "1024")),
+                ttl=cache_ttl,
+                ttl_resumen=ttl_resumen,
+            )
+        if metricas is not None:
+            # Por fuera de la caché, para medir lo que realmente ve quien llama.
+            repositorio = InstrumentedProductoRepository(repositorio, metricas, monitor.umbral_lento)
+        return repositorio
     except ConnectionError as e:
-        logger.error(f"CRÍTICO: No se pudo conectar a la base de datos. {e}")
-        print("Error fatal: No se pudo establecer la conexión con la base de datos.")
-        print("Por favor, verifique la configuración y que el servicio de PostgreSQL esté en ejecución.")
+        logger.error("CRÍTICO: No se pudo conectar a la base de datos. %s", e)
+        print("Error fatal: No se pudo establecer la conexión con la base de datos.", file=sys.stderr)
+        print("Por favor, verifique la configuración y que el servicio de PostgreSQL esté en ejecución.", file=sys.stderr)
         sys.exit(1) # Termina la aplicación si no hay conexión
+    except ValueError as e:
+        logger.error("CRÍTICO: Configuración de base de datos no válida. %s", e)
+        print(f"Error fatal: {e}", file=sys.stderr)
+        sys.exit(1)
+
+# Productos mostrados por página en los listados.
+TAMANO_PAGINA = 20
+
+# Métricas de la aplicación (None si la instrumentación está desactivada).
+metricas: Metricas | None = None
+monitor: MonitorConsultas | None = None
+
+# Repositorio compartido; se crea (y se conecta) la primera vez que una operación lo necesita.
+_repo = None
 
-# Instancia del repositorio que se usará en toda la aplicación.
-repo = inicializar_repositorio()
+def obtener_repositorio():
+    """Devuelve el repositorio de la aplicación, conectándose a la base de datos la primera vez."""
+    global _repo, metricas, monitor
+    if _repo is None:
+        metricas, monitor = configurar_metricas()
+        _repo = inicializar_repositorio()
+    return _repo
+
+def cerrar_repositorio():
+    """
+    Cierra el repositorio compartido, si se llegó a crear. Los puntos de entrada lo llaman antes
+    de salir para que el cierre (y su registro en el log) no quede para la destrucción de objetos
+    al terminar el intérprete, cuando el hilo del logging ya se detuvo.
+    """
+    global _repo
+    if _repo is not None:
+        _repo.close()
+        _repo = None
+
+def limpiar_pantalla():
+    """Limpia la terminal con secuencias ANSI (sin lanzar un proceso); no hace nada si no es una terminal."""
+    if sys.stdout.isatty():
+        print("\033[2J\033[H", end="", flush=True)
 
 def mostrar_menu():
     """Muestra el menú principal de opciones."""
@@ -36,23 +142,25 @@ def mostrar_menu():
     print("="*50)
     print("1. 📦 Agregar producto")
     print("2. 📋 Ver todos los productos")
-    print("3. 🔍 Buscar producto por ID")
+    print("3. 🔍 Buscar producto por ID o nombre")
     print("4. ✏️  Actualizar producto")
     print("5. 🗑️  Eliminar producto")
     print("6. 📄 Exportar inventario a archivo")
     print("7. 🟡 Consultar productos con stock bajo.")
-    print("8. 🚪 Salir")
+    print("8. 📊 Resumen del inventario")
+    print("9. 🚪 Salir")
     print("="*50)
 
-def main():
-    """Función principal que ejecuta el sistema de inventario."""
+def menu_interactivo():
+    """Ejecuta el menú interactivo del sistema de inventario."""
+    repo = obtener_repositorio()
     while True:
         mostrar_menu()
         
-        opcion = input("Seleccione una opción (1-8): ").strip()
+        opcion = input("Seleccione una opción (1-9): ").strip()
         
         # Limpiar pantalla después de seleccionar opción
-        os.system("cls" if os.name == "nt" else "clear")
+        limpiar_pantalla()
 
         if opcion == "1":
             print("📦 AGREGAR NUEVO PRODUCTO")
@@ -67,14 +175,20 @@ def main():
                 precio = float(input("Precio del producto ($): "))
                 stock = int(input("Cantidad en stock: "))
                 if precio < 0 or stock < 0:
-                    logger.warning(f"Intento de crear producto con valores negativos: Precio {precio}, Stock {stock}")
+                    logger.warning("Intento de crear producto con valores negativos: Precio %s, Stock %s", precio, stock)
                     print("❌ El precio y stock deben ser valores positivos.")
                     continue
                 
-                nuevo_producto_data = {"nombre": nombre, "precio": precio, "stock": stock}
+                reorden_input = input(f"Punto de reorden (Enter = {UMBRAL_STOCK_BAJO} unidades): ").strip()
+                punto_reorden = int(reorden_input) if reorden_input else None
+                if punto_reorden is not None and punto_reorden < 0:
+                    print("❌ El punto de reorden no puede ser negativo.")
+                    continue
+
+                nuevo_producto_data = {"nombre": nombre, "precio": precio, "stock": stock, "punto_reorden": punto_reorden}
                 producto_creado = repo.create(nuevo_producto_data)
                 if producto_creado:
-                    logger.info(f"Producto agregado con ID {producto_creado['id']}: {producto_creado['nombre']}")
+                    logger.info("Producto agregado con ID %s: %s", producto_creado['id'], producto_creado['nombre'])
                     print(f"✅ Producto agregado con ID {producto_creado['id']}: {producto_creado['nombre']}")
                 else:
                     logger.error("No se pudo crear el producto en la base de datos.")
@@ -88,43 +202,60 @@ def main():
             print("\n📦 INVENTARIO COMPLETO:")
             print("-" * 60)
             try:
-                productos = repo.get_all()
-                if not productos:
-                    print("No hay productos en la base de datos.")
-                else:
+                ultimo_id = 0
+                while True:
+                    productos = repo.get_page(after_id=ultimo_id, limit=TAMANO_PAGINA)
+                    if not productos and ultimo_id == 0:
+                        print("No hay productos en la base de datos.")
                     for p in productos:
                         estado_stock = ""
                         if p['stock'] == 0:
                             estado_stock = "🔴 SIN STOCK"
-                        elif p['stock'] <= 5:
+                        elif p['stock'] <= (UMBRAL_STOCK_BAJO if p['punto_reorden'] is None else p['punto_reorden']):
                             estado_stock = "🟡 STOCK BAJO"
                         else:
                             estado_stock = "🟢 STOCK OK"
                         print(f"ID: {p['id']} | {p['nombre']} | Precio: ${p['precio']:.2f} | Stock: {p['stock']} | {estado_stock}")
+                    if len(productos) < TAMANO_PAGINA:
+                        break
+                    ultimo_id = productos[-1]['id']
+                    if input("-- Enter para ver más, 'q' para terminar: ").strip().lower() == "q":
+                        break
                 print("-" * 60)
             except Exception as e:
-                logger.error(f"Error al obtener todos los productos: {e}")
+                logger.error("Error al obtener todos los productos: %s", e)
                 print("❌ Ocurrió un error al consultar el inventario.")
             
         elif opcion == "3":
             print("🔍 BUSCAR PRODUCTO")
             print("-" * 30)
             try:
-                id_producto = int(input("ID del producto a buscar: "))
-                producto = repo.get_by_id(id_producto)
+                criterio = input("ID o nombre del producto a buscar: ").strip()
+                if criterio and not criterio.isdigit():
+                    productos = repo.search_by_name(criterio, limit=TAMANO_PAGINA)
+                    if not productos:
+                        print("❌ No hay productos cuyo nombre empiece por ese texto.")
+                    for p in productos:
+                        print(f"ID: {p['id']} | {p['nombre']} | Precio: ${p['precio']:.2f} | Stock: {p['stock']}")
+                    if len(productos) == TAMANO_PAGINA:
+                        print(f"(Se muestran los primeros {TAMANO_PAGINA} resultados; afine la búsqueda para ver otros)")
+                    producto = None
+                else:
+                    id_producto = int(criterio)
+                    producto = repo.get_by_id(id_producto)
+                    if not producto:
+                        print("❌ Producto no encontrado.")
                 if producto:
                     print("\n📋 DETALLE DEL PRODUCTO:")
                     print(f"ID: {producto['id']}")
                     print(f"Nombre: {producto['nombre']}")
                     print(f"Precio: ${producto['precio']:.2f}")
                     print(f"Stock: {producto['stock']} unidades")
-                else:
-                    print("❌ Producto no encontrado.")
             except ValueError:
                 logger.warning("Entrada no válida para buscar producto por ID.")
-                print("❌ Por favor ingrese un ID numérico válido.")
+                print("❌ Por favor ingrese un ID numérico válido o un nombre.")
             except Exception as e:
-                logger.error(f"Error al buscar producto por ID: {e}")
+                logger.error("Error al buscar producto por ID: %s", e)
                 print("❌ Ocurrió un error al buscar el producto.")
             
         elif opcion == "4":
@@ -139,33 +270,45 @@ def main():
                     continue
 
                 print("\n💡 Deje en blanco los campos que no desea cambiar:")
-                nuevo_nombre = input(f"Nuevo nombre (actual: {producto_existente['nombre']}): ").strip() or producto_existente['nombre']
+                cambios = {}
+                nuevo_nombre = input(f"Nuevo nombre (actual: {producto_existente['nombre']}): ").strip()
+                if nuevo_nombre:
+                    cambios["nombre"] = nuevo_nombre
                 
                 precio_input = input(f"Nuevo precio (actual: {producto_existente['precio']}): ").strip()
-                nuevo_precio = float(precio_input) if precio_input else producto_existente['precio']
+                if precio_input:
+                    cambios["precio"] = float(precio_input)
                 
                 stock_input = input(f"Nuevo stock (actual: {producto_existente['stock']}): ").strip()
-                nuevo_stock = int(stock_input) if stock_input else producto_existente['stock']
+                if stock_input:
+                    cambios["stock"] = int(stock_input)
                 
-                if nuevo_precio < 0 or nuevo_stock < 0:
-                    logger.warning(f"Intento de actualizar con valores negativos para ID {id_producto}.")
+                if cambios.get("precio", 0) < 0 or cambios.get("stock", 0) < 0:
+                    logger.warning("Intento de actualizar con valores negativos para ID %s.", id_producto)
                     print("❌ El precio y el stock no pueden ser negativos.")
                     continue
-                    
-                datos_actualizados = {"nombre": nuevo_nombre, "precio": nuevo_precio, "stock": nuevo_stock}
-                producto_actualizado = repo.update(id_producto, datos_actualizados)
-                if producto_actualizado:
-                    logger.info(f"Producto ID {id_producto} actualizado.")
-                    print("✅ Producto actualizado correctamente.")
+
+                if not cambios:
+                    print("ℹ️  No se modificó ningún campo.")
                 else:
-                    logger.error(f"No se pudo actualizar el producto con ID {id_producto}.")
-                    print("❌ Error: No se pudo actualizar el producto.")
+                    # Sólo se envían los campos modificados y se exige que nadie haya cambiado el
+                    # producto mientras se editaba.
+                    producto_actualizado = repo.patch(id_producto, version_esperada=producto_existente['version'], **cambios)
+                    if producto_actualizado:
+                        logger.info("Producto ID %s actualizado.", id_producto)
+                        print("✅ Producto actualizado correctamente.")
+                    else:
+                        logger.error("No se pudo actualizar el producto con ID %s.", id_producto)
+                        print("❌ Error: No se pudo actualizar el producto.")
 
+            except ConflictoDeVersion:
+                logger.warning("Conflicto de versión al actualizar el producto con ID %s.", id_producto)
+                print("❌ Otro usuario modificó el producto mientras lo editaba. Vuelva a intentarlo.")
             except ValueError:
                 logger.warning("Error de valor al actualizar producto.")
                 print("❌ Por favor ingrese valores numéricos válidos para precio y stock.")
             except Exception as e:
-                logger.error(f"Error inesperado al actualizar producto: {e}")
+                logger.error("Error inesperado al actualizar producto: %s", e)
                 print("❌ Ocurrió un error inesperado al actualizar.")
             
         elif opcion == "5":
@@ -174,16 +317,16 @@ def main():
             try:
                 id_producto = int(input("ID del producto a eliminar: "))
                 if repo.delete(id_producto):
-                    logger.info(f"Producto con ID {id_producto} eliminado.")
+                    logger.info("Producto con ID %s eliminado.", id_producto)
                     print("✅ Producto eliminado correctamente.")
                 else:
-                    logger.warning(f"Intento de eliminar producto no existente con ID {id_producto}.")
+                    logger.warning("Intento de eliminar producto no existente con ID %s.", id_producto)
                     print("❌ Producto no encontrado o no se pudo eliminar.")
             except ValueError:
                 logger.warning("Entrada no válida para eliminar producto.")
                 print("❌ Por favor ingrese un ID numérico válido.")
             except Exception as e:
-                logger.error(f"Error al eliminar producto: {e}")
+                logger.error("Error al eliminar producto: %s", e)
                 print("❌ Ocurrió un error al eliminar el producto.")
             
         elif opcion == "6":
@@ -194,33 +337,32 @@ def main():
                 logger.warning("Intento de exportar con nombre de archivo vacío.")
                 print("❌ El nombre del archivo no puede estar vacío.")
                 continue
-            
-            exportar_directory = "exports-txt"
-            try:
-                os.makedirs(exportar_directory, exist_ok=True)
-                filepath = os.path.join(exportar_directory, f"{nombre_archivo}.txt")
 
-                with open(filepath, "w", encoding="utf-8") as archivo:
-                    archivo.write("REPORTE DE INVENTARIO\n")
-                    archivo.write("=" * 50 + "\n\n")
-                    productos = repo.get_all()
-                    for p in productos:
-                        linea = f"ID: {p['id']} | {p['nombre']} | Precio: ${p['precio']:.2f} | Stock: {p['stock']}\n"
-                        archivo.write(linea)
-                logger.info(f"Inventario exportado a {filepath}")
-                print(f"✅ Productos exportados correctamente a {filepath}")
+            formato = input(f"Formato ({'/'.join(FORMATOS)}, Enter = txt): ").strip().lower() or "txt"
+            if formato not in FORMATOS:
+                print(f"❌ Formato no válido. Use uno de: {', '.join(FORMATOS)}.")
+                continue
+            comprimir = input("¿Comprimir con gzip? (s/N): ").strip().lower() == "s"
+
+            filepath = ruta_exportacion(nombre_archivo, formato, comprimir)
+            try:
+                total = exportar_inventario(repo, filepath, formato, comprimir)
+                logger.info("Inventario exportado a %s", filepath)
+                print(f"✅ {total} productos exportados correctamente a {filepath}")
             except IOError as e:
-                logger.error(f"Error de I/O al exportar a {filepath}: {e}")
+                logger.error("Error de I/O al exportar a %s: %s", filepath, e)
                 print(f"❌ Error al escribir en el archivo: {e}")
             except Exception as e:
-                logger.error(f"Error inesperado al exportar productos: {e}")
+                logger.error("Error inesperado al exportar productos: %s", e)
                 print(f"❌ Error inesperado al exportar productos: {e}")
                 
         elif opcion == "7":
-            print("🟡 CONSULTAR PRODUCTOS CON STOCK BAJO (<5 unidades)")
+            print("🟡 CONSULTAR PRODUCTOS CON STOCK BAJO")
             print("-" * 60)
             try:
-                productos_stock_bajo = repo.get_by_low_stock()
+                umbral_input = input("Umbral de stock (Enter = punto de reorden de cada producto): ").strip()
+                umbral = int(umbral_input) if umbral_input else None
+                productos_stock_bajo = repo.get_by_low_stock(umbral=umbral)
                 
                 if not productos_stock_bajo:
                     print("\tNo hay productos con stock bajo 👌🏼")
@@ -229,22 +371,63 @@ def main():
                         estado_stock = "🔴 SIN STOCK" if producto['stock'] == 0 else "🟡 STOCK BAJO"
                         print(f"ID: {producto['id']} | {producto['nombre']} | Precio: ${producto['precio']:.2f} | Stock: {producto['stock']} | {estado_stock}")
                 print("-" * 60)
+            except ValueError:
+                logger.warning("Umbral de stock no válido.")
+                print("❌ Por favor ingrese un umbral numérico válido.")
             except Exception as e:
-                logger.error(f"Error al consultar productos con stock bajo: {e}")
+                logger.error("Error al consultar productos con stock bajo: %s", e)
                 print("❌ Ocurrió un error al realizar la consulta.")
 
         elif opcion == "8":
+            print("📊 RESUMEN DEL INVENTARIO")
+            print("-" * 60)
+            try:
+                resumen = repo.get_inventory_summary()
+                if not resumen:
+                    print("❌ No se pudo calcular el resumen del inventario.")
+                else:
+                    imprimir_resumen(resumen)
+                print("-" * 60)
+            except Exception as e:
+                logger.error("Error al calcular el resumen del inventario: %s", e)
+                print("❌ Ocurrió un error al calcular el resumen.")
+
+        elif opcion == "9":
             print("¡Gracias por usar el Sistema de Inventario!")
             logger.info("Cerrando aplicación.")
             print("🔒 Cerrando aplicación...")
+            volcar_metricas()
             break
             
         else:
-            print("❌ Opción no válida. Por favor seleccione una opción del 1 al 8.")
+            print("❌ Opción no válida. Por favor seleccione una opción del 1 al 9.")
             
+        volcar_metricas()
+
         # Pausa para que el usuario pueda leer el resultado
         input("\n📱 Presione Enter para continuar...")
-        os.system("cls" if os.name == "nt" else "clear")
+        limpiar_pantalla()
+
+def main(argv: List[str] | None = None) -> int:
+    """
+    Punto de entrada: sin argumentos abre el menú interactivo; con un subcomando (add, get,
+    update, delete, list, low-stock, summary, export, import, batch) lo ejecuta y termina.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        configurar_logging_desde_entorno()
+        try:
+            menu_interactivo()
+        finally:
+            cerrar_repositorio()
+        return 0
+    # En modo comando la salida estándar queda reservada para los resultados en JSON.
+    configurar_logging_desde_entorno(consola=False)
+    try:
+        return comandos.main(argv, obtener_repositorio)
+    finally:
+        volcar_metricas()
+        cerrar_repositorio()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,212 @@
+import bisect
+import logging
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+
+# La configuración del logger se realiza en el punto de entrada de la aplicación (main.py)
+
+# Límites superiores (en segundos) de los intervalos de los histogramas de latencia.
+INTERVALOS_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Logger en el que se registran las operaciones y sentencias SQL que superan el umbral de lentitud.
+logger_lentas = logging.getLogger("consultas_lentas")
+
+
+class _Histograma:
+    """Acumula duraciones en intervalos fijos, como un histograma de Prometheus."""
+    __slots__ = ("conteos", "suma", "total")
+
+    def __init__(self, intervalos: int):
+        # Un contador por intervalo y uno final para los valores mayores que el último límite.
+        self.conteos = [0] * (intervalos + 1)
+        self.suma = 0.0
+        self.total = 0
+
+
+class Metricas:
+    """
+    Registro en memoria de las métricas del repositorio, seguro para varios hilos.
+
+    Por operación (`get_by_id`, `create`...) guarda llamadas, errores, filas e histograma de
+    latencia; para las sentencias SQL, el total, los errores, las lentas y su histograma.
+    `exportar_prometheus` devuelve todo en el formato de texto de Prometheus.
+    """
+    def __init__(self, intervalos=INTERVALOS_LATENCIA, prefijo: str = "inventario"):
+        self.intervalos = tuple(intervalos)
+        self.prefijo = prefijo
+        self._lock = threading.Lock()
+        self._llamadas: Dict[str, int] = {}
+        self._errores: Dict[str, int] = {}
+        self._filas: Dict[str, int] = {}
+        self._latencias: Dict[str, _Histograma] = {}
+        self._sql = _Histograma(len(self.intervalos))
+        self._sql_errores = 0
+        self._sql_lentas = 0
+
+    def _observar(self, histograma: _Histograma, duracion: float):
+        histograma.conteos[bisect.bisect_left(self.intervalos, duracion)] += 1
+        histograma.suma += duracion
+        histograma.total += 1
+
+    def registrar_operacion(self, operacion: str, duracion: float, filas: int = 0, error: bool = False):
+        """Registra una llamada a un método del repositorio."""
+        with self._lock:
+            self._llamadas[operacion] = self._llamadas.get(operacion, 0) + 1
+            if error:
+                self._errores[operacion] = self._errores.get(operacion, 0) + 1
+            if filas:
+                self._filas[operacion] = self._filas.get(operacion, 0) + filas
+            histograma = self._latencias.get(operacion)
+            if histograma is None:
+                histograma = self._latencias[operacion] = _Histograma(len(self.intervalos))
+            self._observar(histograma, duracion)
+
+    def registrar_sentencia(self, duracion: float, error: bool = False, lenta: bool = False):
+        """Registra la ejecución de una sentencia SQL."""
+        with self._lock:
+            self._observar(self._sql, duracion)
+            if error:
+                self._sql_errores += 1
+            if lenta:
+                self._sql_lentas += 1
+
+    def resumen(self) -> Dict[str, Dict[str, Any]]:
+        """Devuelve, por operación, llamadas, errores, filas y latencia media en milisegundos."""
+        with self._lock:
+            return {
+                operacion: {
+                    "llamadas": llamadas,
+                    "errores": self._errores.get(operacion, 0),
+                    "filas": self._filas.get(operacion, 0),
+                    "latencia_media_ms": round(self._latencias[operacion].suma / llamadas * 1000, 3),
+                }
+                for operacion, llamadas in sorted(self._llamadas.items())
+            }
+
+    def _lineas_histograma(self, nombre: str, histograma: _Histograma, etiquetas: str) -> List[str]:
+        separador = "," if etiquetas else ""
+        lineas = []
+        acumulado = 0
+        for limite, conteo in zip(self.intervalos, histograma.conteos):
+            acumulado += conteo
+            lineas.append(f'{nombre}_bucket{{{etiquetas}{separador}le="{limite}"}} {acumulado}')
+        lineas.append(f'{nombre}_bucket{{{etiquetas}{separador}le="+Inf"}} {histograma.total}')
+        sufijo = f"{{{etiquetas}}}" if etiquetas else ""
+        lineas.append(f"{nombre}_sum{sufijo} {histograma.suma:.6f}")
+        lineas.append(f"{nombre}_count{sufijo} {histograma.total}")
+        return lineas
+
+    def exportar_prometheus(self) -> str:
+        """Devuelve todas las métricas en el formato de exposición de texto de Prometheus."""
+        p = self.prefijo
+        with self._lock:
+            operaciones = sorted(self._llamadas)
+            lineas = [
+                f"# HELP {p}_operaciones_total Llamadas a cada método del repositorio.",
+                f"# TYPE {p}_operaciones_total counter",
+            ]
+            lineas += [f'{p}_operaciones_total{{operacion="{o}"}} {self._llamadas[o]}' for o in operaciones]
+            lineas += [
+                f"# HELP {p}_errores_total Llamadas que terminaron lanzando una excepción.",
+                f"# TYPE {p}_errores_total counter",
+            ]
+            lineas += [f'{p}_errores_total{{operacion="{o}"}} {self._errores.get(o, 0)}' for o in operaciones]
+            lineas += [
+                f"# HELP {p}_filas_total Filas devueltas o modificadas por cada método.",
+                f"# TYPE {p}_filas_total counter",
+            ]
+            lineas += [f'{p}_filas_total{{operacion="{o}"}} {self._filas.get(o, 0)}' for o in operaciones]
+            lineas += [
+                f"# HELP {p}_operacion_segundos Latencia de cada método del repositorio.",
+                f"# TYPE {p}_operacion_segundos histogram",
+            ]
+            for o in operaciones:
+                lineas += self._lineas_histograma(f"{p}_operacion_segundos", self._latencias[o], f'operacion="{o}"')
+            lineas += [
+                f"# HELP {p}_sql_segundos Duración de cada sentencia SQL.",
+                f"# TYPE {p}_sql_segundos histogram",
+            ]
+            lineas += self._lineas_histograma(f"{p}_sql_segundos", self._sql, "")
+            lineas += [
+                f"# HELP {p}_sql_errores_total Sentencias SQL que fallaron.",
+                f"# TYPE {p}_sql_errores_total counter",
+                f"{p}_sql_errores_total {self._sql_errores}",
+                f"# HELP {p}_sql_lentas_total Sentencias SQL que superaron el umbral de lentitud.",
+                f"# TYPE {p}_sql_lentas_total counter",
+                f"{p}_sql_lentas_total {self._sql_lentas}",
+            ]
+        return "\n".join(lineas) + "\n"
+
+    def escribir_prometheus(self, ruta: str):
+        """
+        Escribe las métricas en `ruta` (por ejemplo, para el textfile collector de node_exporter).
+
+        Se escribe en un temporal del mismo directorio que luego se renombra, así que quien lea
+        el archivo nunca ve un volcado a medias.
+        """
+        directorio = os.path.dirname(ruta) or "."
+        os.makedirs(directorio, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=directorio, prefix=".metricas-", suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w", encoding="utf-8") as archivo:
+                archivo.write(self.exportar_prometheus())
+            os.chmod(temporal, 0o644)
+            os.replace(temporal, ruta)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+
+    def servir_http(self, puerto: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Publica las métricas en `http://host:puerto/metrics` desde un hilo en segundo plano.
+
+        Devuelve el servidor; `shutdown()` lo detiene.
+        """
+        metricas = self
+
+        class _Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                cuerpo = metricas.exportar_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, formato, *args):
+                pass
+
+        servidor = ThreadingHTTPServer((host, puerto), _Manejador)
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, name="metricas-http", daemon=True).start()
+        logging.info("Métricas disponibles en http://%s:%s/metrics", host, servidor.server_port)
+        return servidor
+
+
+class MonitorConsultas:
+    """
+    Mide las sentencias SQL que ejecutan los backends.
+
+    Las que tardan `umbral_lento` segundos o más se registran (con su texto y duración) en el
+    logger "consultas_lentas". Si se indica `metricas`, todas las sentencias se acumulan además
+    en su histograma SQL.
+    """
+    def __init__(self, umbral_lento: float | None = None, metricas: Metricas | None = None):
+        self.umbral_lento = umbral_lento
+        self.metricas = metricas
+
+    def registrar(self, duracion: float, error: bool, sentencia: Callable[[], str]):
+        """Registra una sentencia; `sentencia` sólo se invoca para obtener el texto si hay que registrarlo."""
+        lenta = self.umbral_lento is not None and duracion >= self.umbral_lento
+        if lenta:
+            texto = " ".join(sentencia().split())
+            logger_lentas.warning("Consulta lenta (%.1f ms): %s", duracion * 1000, texto)
+        if self.metricas is not None:
+            self.metricas.registrar_sentencia(duracion, error, lenta)
@@ -0,0 +1,445 @@
+import asyncpg
+import os
+from decimal import Decimal
+from typing import List, Dict, Any, AsyncIterator, Iterable, Tuple
+from producto import Producto
+from repositorio import ConflictoDeVersion, StockInsuficiente, UMBRAL_STOCK_BAJO, VERSION_ESQUEMA, agrupar_lineas, escapar_like, resumen_desde_fila, validar_campos
+from repositorio_async import AsyncProductoRepository
+import logging
+
+# La configuración del logger se realiza en el punto de entrada de la aplicación (main.py)
+
+# Errores de base de datos o de red que las operaciones registran en lugar de propagar.
+_ERRORES_DB = (asyncpg.PostgresError, asyncpg.InterfaceError, OSError)
+
+_COLUMNAS = "id, nombre, precio, stock, punto_reorden, version"
+
+
+def _a_decimal(valor) -> Decimal:
+    """Convierte un precio a Decimal, el tipo que asyncpg espera para columnas NUMERIC."""
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor))
+
+
+class AsyncPostgresProductoRepository(AsyncProductoRepository):
+    """
+    Implementación asíncrona del repositorio de productos sobre PostgreSQL (driver asyncpg).
+
+    Usa el pool de conexiones de asyncpg; cada operación toma una conexión sólo mientras dura
+    la consulta. Hay que llamar a `connect()` (o usar `async with`) antes de las operaciones:
+
+        async with AsyncPostgresProductoRepository() as repo:
+            productos = await obtener_por_ids(repo, ids)
+    """
+    def __init__(self, min_size: int = 1, max_size: int = 20):
+        """
+        :param min_size: Conexiones que el pool mantiene abiertas como mínimo.
+        :param max_size: Conexiones simultáneas como máximo.
+        """
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool: asyncpg.Pool | None = None
+
+    async def connect(self):
+        """Crea el pool de conexiones y el esquema si no existe."""
+        try:
+            self.pool = await asyncpg.create_pool(
+                database=os.getenv("DB_NAME", "hardware_shop_db"),
+                user=os.getenv("DB_USER", "postgres"),
+                password=os.getenv("DB_PASSWORD", "postgres"),
+                host=os.getenv("DB_HOST", "localhost"),
+                port=int(os.getenv("DB_PORT", "5432")),
+                min_size=self.min_size,
+                max_size=self.max_size,
+            )
+            await self._create_table_if_not_exists()
+            logging.info("Conexión asíncrona a PostgreSQL exitosa (pool de %s a %s conexiones).", self.min_size, self.max_size)
+        except _ERRORES_DB as e:
+            logging.error("Error al conectar con PostgreSQL: %s", e)
+            await self.close()
+            raise ConnectionError(f"No se pudo conectar a la base de datos: {e}")
+        return self
+
+    async def close(self):
+        """Cierra el pool de conexiones."""
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+            logging.info("Pool de conexiones asíncronas a PostgreSQL cerrado.")
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _create_table_if_not_exists(self):
+        """
+        Crea la tabla de productos y sus índices si no existen (mismo esquema que la versión síncrona).
+
+        Si `esquema_version` ya registra VERSION_ESQUEMA no se ejecuta ningún DDL.
+        """
+        async with self.pool.acquire() as conn:
+            if await conn.fetchval("SELECT to_regclass('esquema_version') IS NOT NULL;"):
+                if await conn.fetchval("SELECT COALESCE(max(version), 0) FROM esquema_version;") >= VERSION_ESQUEMA:
+                    return
+            await conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS productos (
+                    id SERIAL PRIMARY KEY,
+                    nombre VARCHAR(255) NOT NULL,
+                    precio NUMERIC(10, 2) NOT NULL,
+                    stock INTEGER NOT NULL
+                );
+                ALTER TABLE productos ADD COLUMN IF NOT EXISTS punto_reorden INTEGER;
+                ALTER TABLE productos ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+                CREATE INDEX IF NOT EXISTS idx_productos_stock ON productos (stock, id);
+                CREATE INDEX IF NOT EXISTS idx_productos_reorden
+                    ON productos (stock, id) INCLUDE (nombre, precio, punto_reorden, version)
+                    WHERE stock <= COALESCE(punto_reorden, {UMBRAL_STOCK_BAJO});
+                DROP INDEX IF EXISTS idx_productos_nombre_prefijo;
+                CREATE INDEX IF NOT EXISTS idx_productos_nombre_c
+                    ON productos ((lower(nombre) COLLATE "C"), id);
+                CREATE TABLE IF NOT EXISTS esquema_version (
+                    version INTEGER PRIMARY KEY,
+                    aplicada TIMESTAMPTZ NOT NULL DEFAULT now()
+                );
+                INSERT INTO esquema_version (version) VALUES ({VERSION_ESQUEMA}) ON CONFLICT DO NOTHING;
+            """)
+            logging.info("Esquema de la base de datos actualizado a la versión %s.", VERSION_ESQUEMA)
+
+    async def get_all(self) -> List[Producto]:
+        """Obtiene todos los productos de la base de datos."""
+        try:
+            filas = await self.pool.fetch(f"SELECT {_COLUMNAS} FROM productos ORDER BY id;")
+            logging.info("Se han obtenido todos los productos.")
+            return [Producto.desde_fila(fila) for fila in filas]
+        except _ERRORES_DB as e:
+            logging.error("Error al obtener todos los productos: %s", e)
+            return []
+
+    async def iter_all(self, batch_size: int = 500) -> AsyncIterator[Producto]:
+        """Recorre todos los productos con un cursor del servidor que trae `batch_size` filas por viaje."""
+        total = 0
+        try:
+            async with self.pool.acquire() as conn, conn.transaction(readonly=True):
+                async for fila in conn.cursor(f"SELECT {_COLUMNAS} FROM productos ORDER BY id;", prefetch=batch_size):
+                    total += 1
+                    yield Producto.desde_fila(fila)
+            logging.info("Se han recorrido %s productos.", total)
+        except _ERRORES_DB as e:
+            logging.error("Error al recorrer los productos: %s", e)
+            raise
+
+    async def get_page(self, after_id: int = 0, limit: int = 20) -> List[Producto]:
+        """Obtiene una página de productos usando el ID como cursor."""
+        try:
+            filas = await self.pool.fetch(
+                f"SELECT {_COLUMNAS} FROM productos WHERE id > $1 ORDER BY id LIMIT $2;", after_id, limit
+            )
+            logging.info("Se han obtenido %s productos tras el ID %s.", len(filas), after_id)
+            return [Producto.desde_fila(fila) for fila in filas]
+        except _ERRORES_DB as e:
+            logging.error("Error al obtener la página de productos tras el ID %s: %s", after_id, e)
+            return []
+
+    async def search_by_name(self, termino: str, limit: int = 20) -> List[Producto]:
+        """Busca productos cuyo nombre empieza por `termino`, usando el índice sobre `lower(nombre) COLLATE "C"`."""
+        patron = escapar_like(termino.strip().lower()) + "%"
+        try:
+            filas = await self.pool.fetch(
+                f'SELECT {_COLUMNAS} FROM productos WHERE lower(nombre) COLLATE "C" LIKE $1 '
+                f'ORDER BY lower(nombre) COLLATE "C", id LIMIT $2;',
+                patron, limit
+            )
+            logging.info("La búsqueda '%s' devolvió %s productos.", termino, len(filas))
+            return [Producto.desde_fila(fila) for fila in filas]
+        except _ERRORES_DB as e:
+            logging.error("Error al buscar productos por nombre '%s': %s", termino, e)
+            return []
+
+    async def get_by_id(self, id_producto: int) -> Producto | None:
+        """Obtiene un producto por su ID."""
+        try:
+            fila = await self.pool.fetchrow(f"SELECT {_COLUMNAS} FROM productos WHERE id = $1;", id_producto)
+            if fila:
+                logging.info("Producto con ID %s obtenido.", id_producto)
+            else:
+                logging.warning("No se encontró producto con ID %s.", id_producto)
+            return Producto.desde_fila(fila) if fila else None
+        except _ERRORES_DB as e:
+            logging.error("Error al obtener producto con ID %s: %s", id_producto, e)
+            return None
+
+    async def get_by_ids(self, ids: Iterable[int]) -> List[Producto]:
+        """Obtiene varios productos en una sola consulta `WHERE id = ANY(...)`."""
+        ids = list(ids)
+        if not ids:
+            return []
+        try:
+            filas = await self.pool.fetch(f"SELECT {_COLUMNAS} FROM productos WHERE id = ANY($1::integer[]) ORDER BY id;", ids)
+            logging.info("Se han obtenido %s de %s productos solicitados.", len(filas), len(ids))
+            return [Producto.desde_fila(fila) for fila in filas]
+        except _ERRORES_DB as e:
+            logging.error("Error al obtener %s productos por ID: %s", len(ids), e)
+            return []
+
+    async def create(self, data: Dict[str, Any]) -> Producto | None:
+        """Crea un nuevo producto en la base de datos."""
+        try:
+            fila = await self.pool.fetchrow(
+                f"INSERT INTO productos (nombre, precio, stock, punto_reorden) VALUES ($1, $2, $3, $4) RETURNING {_COLUMNAS};",
+                data['nombre'], _a_decimal(data['precio']), data['stock'], data.get('punto_reorden')
+            )
+            new_product = Producto.desde_fila(fila)
+            logging.info("Producto creado: %s", new_product)
+            return new_product
+        except _ERRORES_DB as e:
+            logging.error("Error al crear producto con datos %s: %s", data, e)
+            return None
+
+    async def update(self, id_producto: int, data: Dict[str, Any]) -> Producto | None:
+        """Actualiza un producto existente en la base de datos."""
+        try:
+            fila = await self.pool.fetchrow(
+                "UPDATE productos SET nombre = $1, precio = $2, stock = $3, punto_reorden = COALESCE($4, punto_reorden), version = version + 1 "
+                f"WHERE id = $5 RETURNING {_COLUMNAS};",
+                data['nombre'], _a_decimal(data['precio']), data['stock'], data.get('punto_reorden'), id_producto
+            )
+            if fila:
+                logging.info("Producto con ID %s actualizado.", id_producto)
+            else:
+                logging.warning("Intento de actualizar producto no existente con ID %s.", id_producto)
+            return Producto.desde_fila(fila) if fila else None
+        except _ERRORES_DB as e:
+            logging.error("Error al actualizar producto con ID %s: %s", id_producto, e)
+            return None
+
+    async def patch(self, id_producto: int, version_esperada: int | None = None, **campos) -> Producto | None:
+        """Actualiza sólo los campos indicados; con `version_esperada` aplica control de concurrencia optimista."""
+        validar_campos(campos)
+        if not campos:
+            return await self.get_by_id(id_producto)
+        if 'precio' in campos:
+            campos['precio'] = _a_decimal(campos['precio'])
+        # Los nombres de columna provienen de CAMPOS_EDITABLES, nunca de la entrada del usuario.
+        asignaciones = ", ".join(f"{campo} = ${i}" for i, campo in enumerate(campos, start=1))
+        parametros = [*campos.values(), id_producto]
+        consulta = f"UPDATE productos SET {asignaciones}, version = version + 1 WHERE id = ${len(parametros)}"
+        if version_esperada is not None:
+            parametros.append(version_esperada)
+            consulta += f" AND version = ${len(parametros)}"
+        consulta += f" RETURNING {_COLUMNAS};"
+        conflicto = False
+        try:
+            async with self.pool.acquire() as conn, conn.transaction():
+                fila = await conn.fetchrow(consulta, *parametros)
+                if fila is None and version_esperada is not None:
+                    conflicto = await conn.fetchval("SELECT 1 FROM productos WHERE id = $1;", id_producto) is not None
+        except _ERRORES_DB as e:
+            logging.error("Error al modificar producto con ID %s: %s", id_producto, e)
+            return None
+        if conflicto:
+            logging.warning("Conflicto de versión al modificar producto con ID %s (se esperaba la versión %s).", id_producto, version_esperada)
+            raise ConflictoDeVersion(f"El producto con ID {id_producto} fue modificado por otro proceso.")
+        if fila:
+            logging.info("Producto con ID %s modificado: %s.", id_producto, ', '.join(campos))
+        else:
+            logging.warning("Intento de modificar producto no existente con ID %s.", id_producto)
+        return Producto.desde_fila(fila) if fila else None
+
+    async def delete(self, id_producto: int) -> bool:
+        """Elimina un producto de la base de datos."""
+        try:
+            estado = await self.pool.execute("DELETE FROM productos WHERE id = $1;", id_producto)
+            if estado != "DELETE 0":
+                logging.info("Producto con ID %s eliminado.", id_producto)
+                return True
+            logging.warning("Intento de eliminar producto no existente con ID %s.", id_producto)
+            return False
+        except _ERRORES_DB as e:
+            logging.error("Error al eliminar producto con ID %s: %s", id_producto, e)
+            return False
+
+    async def create_many(self, data: Iterable[Dict[str, Any]]) -> List[int]:
+        """Crea varios productos en una sola sentencia, pasando cada columna como un arreglo (`unnest`)."""
+        data = list(data)
+        if not data:
+            return []
+        try:
+            filas = await self.pool.fetch(
+                """
+                INSERT INTO productos (nombre, precio, stock, punto_reorden)
+                SELECT nombre, precio, stock, punto_reorden
+                FROM unnest($1::varchar[], $2::numeric[], $3::integer[], $4::integer[])
+                    WITH ORDINALITY AS v(nombre, precio, stock, punto_reorden, orden)
+                ORDER BY orden
+                RETURNING id;
+                """,
+                [d['nombre'] for d in data],
+                [_a_decimal(d['precio']) for d in data],
+                [d['stock'] for d in data],
+                [d.get('punto_reorden') for d in data],
+            )
+            ids = [fila['id'] for fila in filas]
+            logging.info("Se han creado %s productos en bloque.", len(ids))
+            return ids
+        except _ERRORES_DB as e:
+            logging.error("Error al crear %s productos en bloque: %s", len(data), e)
+            return []
+
+    async def update_many(self, data: Iterable[Dict[str, Any]]) -> int:
+        """Actualiza varios productos en una sola sentencia UPDATE ... FROM unnest(...)."""
+        data = list(data)
+        if not data:
+            return 0
+        try:
+            estado = await self.pool.execute(
+                """
+                UPDATE productos AS p
+                SET nombre = v.nombre, precio = v.precio, stock = v.stock,
+                    punto_reorden = COALESCE(v.punto_reorden, p.punto_reorden), version = p.version + 1
+                FROM unnest($1::integer[], $2::varchar[], $3::numeric[], $4::integer[], $5::integer[])
+                    AS v(id, nombre, precio, stock, punto_reorden)
+                WHERE p.id = v.id;
+                """,
+                [d['id'] for d in data],
+                [d['nombre'] for d in data],
+                [_a_decimal(d['precio']) for d in data],
+                [d['stock'] for d in data],
+                [d.get('punto_reorden') for d in data],
+            )
+            actualizados = int(estado.split()[-1])
+            logging.info("Se han actualizado %s productos en bloque.", actualizados)
+            return actualizados
+        except _ERRORES_DB as e:
+            logging.error("Error al actualizar %s productos en bloque: %s", len(data), e)
+            return 0
+
+    async def delete_many(self, ids: Iterable[int]) -> int:
+        """Elimina varios productos con una única sentencia `DELETE ... WHERE id = ANY(...)`."""
+        ids = list(ids)
+        if not ids:
+            return 0
+        try:
+            estado = await self.pool.execute("DELETE FROM productos WHERE id = ANY($1::integer[]);", ids)
+            eliminados = int(estado.split()[-1])
+            logging.info("Se han eliminado %s productos en bloque.", eliminados)
+            return eliminados
+        except _ERRORES_DB as e:
+            logging.error("Error al eliminar %s productos en bloque: %s", len(ids), e)
+            return 0
+
+    async def get_by_low_stock(self, umbral: int | None = None, limite: int | None = None) -> List[Producto]:
+        """Obtiene productos con stock bajo según `umbral` o, si no se indica, según su punto de reorden."""
+        try:
+            if umbral is None:
+                filas = await self.pool.fetch(
+                    f"SELECT {_COLUMNAS} FROM productos "
+                    f"WHERE stock <= COALESCE(punto_reorden, {UMBRAL_STOCK_BAJO}) ORDER BY stock, id LIMIT $1;",
+                    limite
+                )
+            else:
+                filas = await self.pool.fetch(
+                    f"SELECT {_COLUMNAS} FROM productos WHERE stock <= $1 ORDER BY stock, id LIMIT $2;",
+                    umbral, limite
+                )
+            logging.info("Se han obtenido %s productos con stock bajo.", len(filas))
+            return [Producto.desde_fila(fila) for fila in filas]
+        except _ERRORES_DB as e:
+            logging.error("Error al obtener productos con stock bajo: %s", e)
+            return []
+
+    async def get_inventory_summary(self, umbral: int | None = None, top: int = 5) -> Dict[str, Any]:
+        """Calcula valor total, bandas de stock y top-N por valor con una única consulta agregada."""
+        try:
+            fila = await self.pool.fetchrow(
+                f"""
+                WITH top AS (
+                    SELECT id, nombre, precio, stock, precio * stock AS valor
+                    FROM productos ORDER BY precio * stock DESC, id LIMIT $2
+                )
+                SELECT count(*),
+                       COALESCE(sum(stock), 0),
+                       COALESCE(sum(precio * stock), 0),
+                       count(*) FILTER (WHERE stock = 0),
+                       count(*) FILTER (WHERE stock > 0 AND stock <= COALESCE($1::integer, punto_reorden, {UMBRAL_STOCK_BAJO})),
+                       count(*) FILTER (WHERE stock > COALESCE($1::integer, punto_reorden, {UMBRAL_STOCK_BAJO})),
+                       (SELECT COALESCE(json_agg(top ORDER BY valor DESC, id), '[]'::json) FROM top)
+                FROM productos;
+                """,
+                umbral, top
+            )
+            logging.info("Se ha calculado el resumen del inventario.")
+            return resumen_desde_fila(tuple(fila))
+        except _ERRORES_DB as e:
+            logging.error("Error al calcular el resumen del inventario: %s", e)
+            return {}
+
+    async def adjust_stock(self, id_producto: int, delta: int) -> Producto | None:
+        """Suma `delta` al stock con `stock = stock + delta`; la condición del WHERE impide dejarlo negativo."""
+        insuficiente = False
+        try:
+            async with self.pool.acquire() as conn, conn.transaction():
+                fila = await conn.fetchrow(
+                    f"""
+                    UPDATE productos SET stock = stock + $2, version = version + 1
+                    WHERE id = $1 AND stock + $2 >= 0
+                    RETURNING {_COLUMNAS};
+                    """,
+                    id_producto, delta
+                )
+                if fila is None:
+                    insuficiente = await conn.fetchval("SELECT 1 FROM productos WHERE id = $1;", id_producto) is not None
+        except _ERRORES_DB as e:
+            logging.error("Error al ajustar el stock del producto con ID %s: %s", id_producto, e)
+            return None
+        if insuficiente:
+            logging.warning("Stock insuficiente para ajustar en %s el producto con ID %s.", delta, id_producto)
+            raise StockInsuficiente([id_producto])
+        if fila:
+            logging.info("Stock del producto con ID %s ajustado en %s (queda %s).", id_producto, delta, fila['stock'])
+        else:
+            logging.warning("Intento de ajustar el stock de un producto no existente con ID %s.", id_producto)
+        return Producto.desde_fila(fila) if fila else None
+
+    async def apply_order(self, lineas: Iterable[Tuple[int, int]]) -> List[Producto]:
+        """
+        Aplica las líneas del pedido en una transacción: bloquea las filas con
+        `SELECT ... ORDER BY id FOR UPDATE`, comprueba el stock y las actualiza con un único
+        UPDATE ... FROM unnest(...).
+        """
+        deltas = agrupar_lineas(lineas)
+        if not deltas:
+            return []
+        ids = list(deltas)
+        inexistentes: List[int] = []
+        insuficientes: List[int] = []
+        filas = []
+        try:
+            async with self.pool.acquire() as conn, conn.transaction():
+                actuales = dict(await conn.fetch(
+                    "SELECT id, stock FROM productos WHERE id = ANY($1::integer[]) ORDER BY id FOR UPDATE;", ids
+                ))
+                inexistentes = [i for i in ids if i not in actuales]
+                insuficientes = [i for i in ids if i in actuales and actuales[i] + deltas[i] < 0]
+                if not (inexistentes or insuficientes):
+                    filas = await conn.fetch(
+                        f"""
+                        UPDATE productos AS p SET stock = p.stock + v.delta, version = p.version + 1
+                        FROM unnest($1::integer[], $2::integer[]) AS v(id, delta)
+                        WHERE p.id = v.id
+                        RETURNING {", ".join(f"p.{columna}" for columna in _COLUMNAS.split(", "))};
+                        """,
+                        ids, list(deltas.values())
+                    )
+        except _ERRORES_DB as e:
+            logging.error("Error al aplicar un pedido de %s productos: %s", len(deltas), e)
+            return []
+        if inexistentes:
+            logging.warning("Pedido rechazado: no existen los productos con ID %s.", inexistentes)
+            raise ValueError(f"No existen los productos con ID {', '.join(map(str, inexistentes))}.")
+        if insuficientes:
+            logging.warning("Pedido rechazado: stock insuficiente para los productos con ID %s.", insuficientes)
+            raise StockInsuficiente(insuficientes)
+        productos = sorted((Producto.desde_fila(fila) for fila in filas), key=lambda p: p['id'])
+        logging.info("Pedido aplicado sobre %s productos.", len(productos))
+        return productos
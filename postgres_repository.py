@@ -1,38 +1,198 @@
 import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+import psycopg2.pool
+from psycopg2 import sql
 import os
-from typing import List, Dict, Any
-from repositorio import ProductoRepository
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Sequence, TextIO, Tuple
+from metricas import MonitorConsultas
+from producto import Producto
+from repositorio import ProductoRepository, ConflictoDeVersion, StockInsuficiente, UMBRAL_STOCK_BAJO, VERSION_ESQUEMA, agrupar_lineas, escapar_like, resumen_desde_fila, validar_campos
 import logging
 
 # La configuración del logger se realiza en el punto de entrada de la aplicación (main.py)
 
+class _CursorMonitorizado(psycopg2.extensions.cursor):
+    """Cursor que informa a un `MonitorConsultas` de la duración de cada sentencia que ejecuta."""
+    monitor: MonitorConsultas
+
+    def _texto(self, consulta) -> Callable[[], str]:
+        return lambda: consulta.as_string(self) if isinstance(consulta, sql.Composable) else str(consulta)
+
+    def execute(self, query, vars=None):
+        inicio = time.perf_counter()
+        error = False
+        try:
+            return super().execute(query, vars)
+        except psycopg2.Error:
+            error = True
+            raise
+        finally:
+            self.monitor.registrar(time.perf_counter() - inicio, error, self._texto(query))
+
+    def executemany(self, query, vars_list):
+        inicio = time.perf_counter()
+        error = False
+        try:
+            return super().executemany(query, vars_list)
+        except psycopg2.Error:
+            error = True
+            raise
+        finally:
+            self.monitor.registrar(time.perf_counter() - inicio, error, self._texto(query))
+
+    def copy_expert(self, consulta, file, size=8192):
+        inicio = time.perf_counter()
+        error = False
+        try:
+            return super().copy_expert(consulta, file, size)
+        except psycopg2.Error:
+            error = True
+            raise
+        finally:
+            self.monitor.registrar(time.perf_counter() - inicio, error, self._texto(consulta))
+
 class PostgresProductoRepository(ProductoRepository):
-    """Implementación del repositorio de productos que usa una base de datos PostgreSQL."""
-    def __init__(self):
-        """Inicializa la conexión a la base de datos."""
-        self.conn = None
-        try:
-            # Idealmente, estos datos de conexión deberían venir de variables de entorno o un archivo de configuración
-            self.conn = psycopg2.connect(
-                dbname="hardware_shop_db", 
-                user="postgres", 
-                password="postgres", 
-                host="localhost", 
-                port="5432"
+    """
+    Implementación del repositorio de productos que usa una base de datos PostgreSQL.
+
+    Las conexiones se obtienen de un pool compartido (``ThreadedConnectionPool``) en cada
+    operación, por lo que una misma instancia puede usarse desde varios hilos a la vez.
+    """
+    def __init__(self, minconn: int = 1, maxconn: int = 10, verificar_tras: float = 30.0,
+                 monitor: MonitorConsultas | None = None, base_datos: str | None = None):
+        """
+        Inicializa el pool de conexiones a la base de datos.
+
+        :param minconn: Conexiones que el pool mantiene abiertas como mínimo.
+        :param maxconn: Conexiones simultáneas como máximo; los hilos adicionales esperan turno.
+        :param verificar_tras: Segundos de inactividad tras los cuales una conexión se comprueba
+            con ``SELECT 1`` antes de reutilizarla. En cuanto se detecta una conexión caída, todas
+            las usadas antes se comprueban también, sin esperar a este plazo.
+        :param monitor: Si se indica, cada sentencia SQL se cronometra (y las lentas se registran)
+            con un cursor propio; sin él se usa el cursor normal de psycopg2, sin coste añadido.
+        :param base_datos: Base de datos a la que conectarse (por defecto, la variable DB_NAME).
+        """
+        self.pool = None
+        if minconn < 1 or maxconn < minconn:
+            raise ValueError("Se requiere 1 <= minconn <= maxconn.")
+        self.verificar_tras = verificar_tras
+        self._cupos = threading.BoundedSemaphore(maxconn)
+        self._ultimo_uso: Dict[int, float] = {}
+        # Momento en que se detectó la última conexión caída (0: ninguna).
+        self._ultima_caida = 0.0
+        opciones: Dict[str, Any] = {}
+        if monitor is not None:
+            opciones["cursor_factory"] = type("CursorMonitorizado", (_CursorMonitorizado,), {"monitor": monitor})
+        try:
+            self.pool = psycopg2.pool.ThreadedConnectionPool(
+                minconn,
+                maxconn,
+                dbname=base_datos or os.getenv("DB_NAME", "hardware_shop_db"),
+                user=os.getenv("DB_USER", "postgres"),
+                password=os.getenv("DB_PASSWORD", "postgres"),
+                host=os.getenv("DB_HOST", "localhost"),
+                port=os.getenv("DB_PORT", "5432"),
+                **opciones,
             )
             self._create_table_if_not_exists()
-            logging.info("Conexión a PostgreSQL exitosa.")
+            logging.info("Conexión a PostgreSQL exitosa (pool de %s a %s conexiones).", minconn, maxconn)
         except psycopg2.OperationalError as e:
-            logging.error(f"Error al conectar con PostgreSQL: {e}")
-            # Si no se puede conectar, self.conn será None y las operaciones fallarán controladamente.
+            logging.error("Error al conectar con PostgreSQL: %s", e)
+            self.close()
             raise ConnectionError(f"No se pudo conectar a la base de datos: {e}")
 
-    def _create_table_if_not_exists(self):
-        """Crea la tabla de productos si no existe."""
-        if not self.conn:
+    def _conexion_valida(self, conn) -> bool:
+        """
+        Comprueba que una conexión del pool siga utilizable. Se verifica con ``SELECT 1`` si lleva
+        inactiva `verificar_tras` segundos o si su último uso es anterior a la última conexión caída
+        detectada (tras un reinicio del servidor lo normal es que todas las del pool estén caídas).
+        """
+        if conn.closed:
+            return False
+        ultimo_uso = self._ultimo_uso.get(id(conn), 0.0)
+        if time.monotonic() - ultimo_uso < self.verificar_tras and ultimo_uso > self._ultima_caida:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            logging.warning("Conexión del pool descartada: %s", e)
+            return False
+
+    def _obtener_conexion(self):
+        """Toma del pool una conexión utilizable, descartando las caídas hasta encontrar una."""
+        # El pool nunca guarda más de maxconn conexiones, así que tras descartarlas todas
+        # getconn() abre una nueva; si el servidor no responde, lanza la excepción.
+        for _ in range(self.pool.maxconn + 1):
+            conn = self.pool.getconn()
+            if self._conexion_valida(conn):
+                return conn
+            self._descartar(conn)
+        raise psycopg2.OperationalError("No se pudo obtener una conexión válida del pool.")
+
+    def _descartar(self, conn):
+        """Cierra una conexión caída y hace que las demás del pool se verifiquen antes de usarse."""
+        self._ultimo_uso.pop(id(conn), None)
+        self._ultima_caida = time.monotonic()
+        if self.pool:
+            self.pool.putconn(conn, close=True)
+
+    @contextmanager
+    def _connection(self):
+        """
+        Presta una conexión del pool durante una operación y la devuelve al terminar.
+
+        Las conexiones caídas se cierran y se reemplazan por una nueva. Si la operación deja
+        una transacción abierta, se revierte antes de devolver la conexión al pool.
+        """
+        if not self.pool:
+            raise psycopg2.pool.PoolError("El pool de conexiones está cerrado.")
+        with self._cupos:
+            conn = None
+            try:
+                conn = self._obtener_conexion()
+                yield conn
+            finally:
+                if conn is not None:
+                    self._devolver(conn)
+
+    def _devolver(self, conn):
+        """Devuelve una conexión al pool tras revertir su transacción, o la descarta si está caída."""
+        descartar = bool(conn.closed)
+        if not descartar and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                descartar = True
+        if descartar:
+            self._descartar(conn)
             return
+        self._ultimo_uso[id(conn)] = time.monotonic()
+        if self.pool:
+            self.pool.putconn(conn)
+
+    def _create_table_if_not_exists(self):
+        """
+        Crea la tabla de productos y sus índices si no existen.
+
+        La versión aplicada se registra en la tabla `esquema_version`; si ya es VERSION_ESQUEMA,
+        el arranque se limita a esa comprobación y no ejecuta ningún DDL.
+        """
         try:
-            with self.conn.cursor() as cur:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute("SELECT to_regclass('esquema_version') IS NOT NULL;")
+                if cur.fetchone()[0]:
+                    cur.execute("SELECT COALESCE(max(version), 0) FROM esquema_version;")
+                    if cur.fetchone()[0] >= VERSION_ESQUEMA:
+                        conn.rollback()
+                        return
                 cur.execute("""
                     CREATE TABLE IF NOT EXISTS productos (
                         id SERIAL PRIMARY KEY,
@@ -41,128 +201,518 @@ class PostgresProductoRepository(ProductoRepository):
                         stock INTEGER NOT NULL
                     );
                 """)
-                self.conn.commit()
+                cur.execute("ALTER TABLE productos ADD COLUMN IF NOT EXISTS punto_reorden INTEGER;")
+                # Versión de la fila para el control de concurrencia optimista de `patch`.
+                cur.execute("ALTER TABLE productos ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;")
+                # Índice para consultas de stock bajo con un umbral explícito (stock <= N ORDER BY stock).
+                cur.execute("CREATE INDEX IF NOT EXISTS idx_productos_stock ON productos (stock, id);")
+                # Índice parcial y de cobertura para la consulta por punto de reorden: sólo contiene los
+                # productos por reponer, así que la consulta se resuelve leyendo únicamente el índice.
+                cur.execute(f"""
+                    CREATE INDEX IF NOT EXISTS idx_productos_reorden
+                    ON productos (stock, id) INCLUDE (nombre, precio, punto_reorden, version)
+                    WHERE stock <= COALESCE(punto_reorden, {UMBRAL_STOCK_BAJO});
+                """)
+                # Índice para búsquedas por prefijo de nombre sin distinguir mayúsculas. Con la collation
+                # "C" el mismo índice resuelve el rango de LIKE 'abc%' y devuelve las filas ya en el
+                # orden de ORDER BY lower(nombre) COLLATE "C", id, sin ordenar todas las coincidencias.
+                cur.execute("DROP INDEX IF EXISTS idx_productos_nombre_prefijo;")
+                cur.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_productos_nombre_c
+                    ON productos ((lower(nombre) COLLATE "C"), id);
+                """)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS esquema_version (
+                        version INTEGER PRIMARY KEY,
+                        aplicada TIMESTAMPTZ NOT NULL DEFAULT now()
+                    );
+                """)
+                cur.execute("INSERT INTO esquema_version (version) VALUES (%s) ON CONFLICT DO NOTHING;", (VERSION_ESQUEMA,))
+                conn.commit()
+                logging.info("Esquema de la base de datos actualizado a la versión %s.", VERSION_ESQUEMA)
         except psycopg2.Error as e:
-            logging.error(f"Error al crear la tabla 'productos': {e}")
-            self.conn.rollback()
+            logging.error("Error al crear la tabla 'productos': %s", e)
+
+    def _row_factory(self, cur) -> Callable[[Sequence[Any]], Producto]:
+        """
+        Devuelve la función que convierte las filas de la consulta actual en objetos Producto.
 
-    def _to_dict(self, cur, row) -> Dict[str, Any] | None:
-        """Convierte una fila de la base de datos a un diccionario."""
+        La descripción de columnas se lee una sola vez por consulta; si coincide con el orden de
+        `Producto.__slots__` (lo habitual), cada fila se convierte sin crear diccionarios intermedios.
+        """
+        columnas = tuple(d[0] for d in cur.description)
+        if columnas == Producto.__slots__:
+            return Producto.desde_fila
+        return lambda row: Producto(**dict(zip(columnas, row)))
+
+    def _to_producto(self, cur, row) -> Producto | None:
+        """Convierte una única fila (o None) en un Producto."""
         if row is None:
             return None
-        try:
-            desc = [d[0] for d in cur.description]
-            return dict(zip(desc, row))
-        except Exception as e:
-            logging.error(f"Error al convertir fila a diccionario: {e}")
-            return None
+        return self._row_factory(cur)(row)
 
-    def get_all(self) -> List[Dict[str, Any]]:
+    def get_all(self) -> List[Producto]:
         """Obtiene todos los productos de la base de datos."""
-        if not self.conn:
-            return []
         try:
-            with self.conn.cursor() as cur:
-                cur.execute("SELECT id, nombre, precio, stock FROM productos ORDER BY id;")
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute("SELECT id, nombre, precio, stock, punto_reorden, version FROM productos ORDER BY id;")
                 logging.info("Se han obtenido todos los productos.")
-                return [self._to_dict(cur, row) for row in cur.fetchall()]
+                return list(map(self._row_factory(cur), cur.fetchall()))
         except psycopg2.Error as e:
-            logging.error(f"Error al obtener todos los productos: {e}")
+            logging.error("Error al obtener todos los productos: %s", e)
             return []
 
-    def get_by_id(self, id_producto: int) -> Dict[str, Any] | None:
+    def iter_all(self, batch_size: int = 500) -> Iterator[Producto]:
+        """
+        Recorre todos los productos usando un cursor del lado del servidor.
+
+        Las filas se traen en lotes de `batch_size` con `fetchmany`, así que la memoria usada
+        no depende del tamaño de la tabla. La conexión queda prestada mientras dure el recorrido.
+        Los errores se registran y se propagan.
+        """
+        total = 0
+        try:
+            with self._connection() as conn:
+                with conn.cursor(name=f"productos_iter_{uuid.uuid4().hex}") as cur:
+                    cur.itersize = batch_size
+                    cur.execute("SELECT id, nombre, precio, stock, punto_reorden, version FROM productos ORDER BY id;")
+                    crear = None
+                    while True:
+                        filas = cur.fetchmany(batch_size)
+                        if not filas:
+                            break
+                        # En un cursor con nombre la descripción sólo existe tras el primer fetch.
+                        crear = crear or self._row_factory(cur)
+                        for row in filas:
+                            yield crear(row)
+                        total += len(filas)
+                conn.rollback()
+            logging.info("Se han recorrido %s productos.", total)
+        except psycopg2.Error as e:
+            logging.error("Error al recorrer los productos: %s", e)
+            raise
+
+    def get_page(self, after_id: int = 0, limit: int = 20) -> List[Producto]:
+        """Obtiene una página de productos usando el ID como cursor (recorre sólo el índice de la clave primaria)."""
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    "SELECT id, nombre, precio, stock, punto_reorden, version FROM productos WHERE id > %s ORDER BY id LIMIT %s;",
+                    (after_id, limit)
+                )
+                productos = list(map(self._row_factory(cur), cur.fetchall()))
+                logging.info("Se han obtenido %s productos tras el ID %s.", len(productos), after_id)
+                return productos
+        except psycopg2.Error as e:
+            logging.error("Error al obtener la página de productos tras el ID %s: %s", after_id, e)
+            return []
+
+    def search_by_name(self, termino: str, limit: int = 20) -> List[Producto]:
+        """Busca productos cuyo nombre empieza por `termino`, usando el índice sobre `lower(nombre) COLLATE "C"`."""
+        patron = escapar_like(termino.strip().lower()) + "%"
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    "SELECT id, nombre, precio, stock, punto_reorden, version FROM productos "
+                    "WHERE lower(nombre) COLLATE \"C\" LIKE %s ORDER BY lower(nombre) COLLATE \"C\", id LIMIT %s;",
+                    (patron, limit)
+                )
+                productos = list(map(self._row_factory(cur), cur.fetchall()))
+                logging.info("La búsqueda '%s' devolvió %s productos.", termino, len(productos))
+                return productos
+        except psycopg2.Error as e:
+            logging.error("Error al buscar productos por nombre '%s': %s", termino, e)
+            return []
+
+    def get_by_id(self, id_producto: int) -> Producto | None:
         """Obtiene un producto por su ID."""
-        if not self.conn:
-            return None
         try:
-            with self.conn.cursor() as cur:
-                cur.execute("SELECT id, nombre, precio, stock FROM productos WHERE id = %s;", (id_producto,))
-                producto = self._to_dict(cur, cur.fetchone())
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute("SELECT id, nombre, precio, stock, punto_reorden, version FROM productos WHERE id = %s;", (id_producto,))
+                producto = self._to_producto(cur, cur.fetchone())
                 if producto:
-                    logging.info(f"Producto con ID {id_producto} obtenido.")
+                    logging.info("Producto con ID %s obtenido.", id_producto)
                 else:
-                    logging.warning(f"No se encontró producto con ID {id_producto}.")
+                    logging.warning("No se encontró producto con ID %s.", id_producto)
                 return producto
         except psycopg2.Error as e:
-            logging.error(f"Error al obtener producto con ID {id_producto}: {e}")
+            logging.error("Error al obtener producto con ID %s: %s", id_producto, e)
             return None
 
-    def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def get_by_ids(self, ids: Iterable[int]) -> List[Producto]:
+        """Obtiene varios productos en una sola consulta `WHERE id = ANY(...)`."""
+        ids = list(ids)
+        if not ids:
+            return []
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    "SELECT id, nombre, precio, stock, punto_reorden, version FROM productos WHERE id = ANY(%s) ORDER BY id;",
+                    (ids,)
+                )
+                productos = list(map(self._row_factory(cur), cur.fetchall()))
+                logging.info("Se han obtenido %s de %s productos solicitados.", len(productos), len(ids))
+                return productos
+        except psycopg2.Error as e:
+            logging.error("Error al obtener %s productos por ID: %s", len(ids), e)
+            return []
+
+    def create(self, data: Dict[str, Any]) -> Producto | None:
         """Crea un nuevo producto en la base de datos."""
-        if not self.conn:
-            return None
         try:
-            with self.conn.cursor() as cur:
+            with self._connection() as conn, conn.cursor() as cur:
                 cur.execute(
-                    "INSERT INTO productos (nombre, precio, stock) VALUES (%s, %s, %s) RETURNING id, nombre, precio, stock;",
-                    (data['nombre'], data['precio'], data['stock'])
+                    "INSERT INTO productos (nombre, precio, stock, punto_reorden) VALUES (%s, %s, %s, %s) RETURNING id, nombre, precio, stock, punto_reorden, version;",
+                    (data['nombre'], data['precio'], data['stock'], data.get('punto_reorden'))
                 )
-                new_product = self._to_dict(cur, cur.fetchone())
-                self.conn.commit()
-                logging.info(f"Producto creado: {new_product}")
+                new_product = self._to_producto(cur, cur.fetchone())
+                conn.commit()
+                logging.info("Producto creado: %s", new_product)
                 return new_product
         except psycopg2.Error as e:
-            logging.error(f"Error al crear producto con datos {data}: {e}")
-            self.conn.rollback()
+            logging.error("Error al crear producto con datos %s: %s", data, e)
             return None
 
-    def update(self, id_producto: int, data: Dict[str, Any]) -> Dict[str, Any] | None:
+    def update(self, id_producto: int, data: Dict[str, Any]) -> Producto | None:
         """Actualiza un producto existente en la base de datos."""
-        if not self.conn:
-            return None
         try:
-            with self.conn.cursor() as cur:
+            with self._connection() as conn, conn.cursor() as cur:
                 cur.execute(
-                    "UPDATE productos SET nombre = %s, precio = %s, stock = %s WHERE id = %s RETURNING id, nombre, precio, stock;",
-                    (data['nombre'], data['precio'], data['stock'], id_producto)
+                    "UPDATE productos SET nombre = %s, precio = %s, stock = %s, punto_reorden = COALESCE(%s, punto_reorden), version = version + 1 "
+                    "WHERE id = %s RETURNING id, nombre, precio, stock, punto_reorden, version;",
+                    (data['nombre'], data['precio'], data['stock'], data.get('punto_reorden'), id_producto)
                 )
-                updated_product = self._to_dict(cur, cur.fetchone())
-                self.conn.commit()
+                updated_product = self._to_producto(cur, cur.fetchone())
+                conn.commit()
                 if updated_product:
-                    logging.info(f"Producto con ID {id_producto} actualizado.")
+                    logging.info("Producto con ID %s actualizado.", id_producto)
                 else:
-                    logging.warning(f"Intento de actualizar producto no existente con ID {id_producto}.")
+                    logging.warning("Intento de actualizar producto no existente con ID %s.", id_producto)
                 return updated_product
         except psycopg2.Error as e:
-            logging.error(f"Error al actualizar producto con ID {id_producto}: {e}")
-            self.conn.rollback()
+            logging.error("Error al actualizar producto con ID %s: %s", id_producto, e)
             return None
 
+    def patch(self, id_producto: int, version_esperada: int | None = None, **campos) -> Producto | None:
+        """
+        Actualiza sólo los campos indicados con un único UPDATE ... RETURNING.
+
+        Con `version_esperada` la fila sólo se modifica si su versión coincide; si no, se lanza
+        ConflictoDeVersion.
+        """
+        validar_campos(campos)
+        if not campos:
+            return self.get_by_id(id_producto)
+        asignaciones = sql.SQL(", ").join(
+            sql.SQL("{} = {}").format(sql.Identifier(campo), sql.Placeholder()) for campo in campos
+        )
+        consulta = sql.SQL("UPDATE productos SET {}, version = version + 1 WHERE id = %s").format(asignaciones)
+        parametros = [*campos.values(), id_producto]
+        if version_esperada is not None:
+            consulta += sql.SQL(" AND version = %s")
+            parametros.append(version_esperada)
+        consulta += sql.SQL(" RETURNING id, nombre, precio, stock, punto_reorden, version;")
+        conflicto = False
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute(consulta, parametros)
+                updated_product = self._to_producto(cur, cur.fetchone())
+                if updated_product is None and version_esperada is not None:
+                    cur.execute("SELECT 1 FROM productos WHERE id = %s;", (id_producto,))
+                    conflicto = cur.fetchone() is not None
+                conn.commit()
+        except psycopg2.Error as e:
+            logging.error("Error al modificar producto con ID %s: %s", id_producto, e)
+            return None
+        if conflicto:
+            logging.warning("Conflicto de versión al modificar producto con ID %s (se esperaba la versión %s).", id_producto, version_esperada)
+            raise ConflictoDeVersion(f"El producto con ID {id_producto} fue modificado por otro proceso.")
+        if updated_product:
+            logging.info("Producto con ID %s modificado: %s.", id_producto, ', '.join(campos))
+        else:
+            logging.warning("Intento de modificar producto no existente con ID %s.", id_producto)
+        return updated_product
+
     def delete(self, id_producto: int) -> bool:
         """Elimina un producto de la base de datos."""
-        if not self.conn:
-            return False
         try:
-            with self.conn.cursor() as cur:
+            with self._connection() as conn, conn.cursor() as cur:
                 cur.execute("DELETE FROM productos WHERE id = %s;", (id_producto,))
-                self.conn.commit()
+                conn.commit()
                 if cur.rowcount > 0:
-                    logging.info(f"Producto con ID {id_producto} eliminado.")
+                    logging.info("Producto con ID %s eliminado.", id_producto)
                     return True
                 else:
-                    logging.warning(f"Intento de eliminar producto no existente con ID {id_producto}.")
+                    logging.warning("Intento de eliminar producto no existente con ID %s.", id_producto)
                     return False
         except psycopg2.Error as e:
-            logging.error(f"Error al eliminar producto con ID {id_producto}: {e}")
-            self.conn.rollback()
+            logging.error("Error al eliminar producto con ID %s: %s", id_producto, e)
             return False
 
-    def get_by_low_stock(self) -> List[Dict[str, Any]]:
-        """Obtiene productos con stock bajo (<= 5)."""
-        if not self.conn:
+    def create_many(self, data: Iterable[Dict[str, Any]], page_size: int = 1000) -> List[int]:
+        """
+        Crea varios productos en una sola transacción.
+
+        Usa INSERT con VALUES de varias filas (`execute_values`), enviando `page_size` filas por
+        sentencia. Si alguna fila falla no se crea ninguna y se devuelve una lista vacía.
+        """
+        filas = [(d['nombre'], d['precio'], d['stock'], d.get('punto_reorden')) for d in data]
+        if not filas:
+            return []
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                resultado = psycopg2.extras.execute_values(
+                    cur,
+                    "INSERT INTO productos (nombre, precio, stock, punto_reorden) VALUES %s RETURNING id;",
+                    filas,
+                    page_size=page_size,
+                    fetch=True,
+                )
+                conn.commit()
+                ids = [row[0] for row in resultado]
+                logging.info("Se han creado %s productos en bloque.", len(ids))
+                return ids
+        except psycopg2.Error as e:
+            logging.error("Error al crear %s productos en bloque: %s", len(filas), e)
             return []
+
+    def update_many(self, data: Iterable[Dict[str, Any]], page_size: int = 1000) -> int:
+        """Actualiza varios productos en una sola transacción con un UPDATE ... FROM (VALUES ...)."""
+        filas = [(d['id'], d['nombre'], d['precio'], d['stock'], d.get('punto_reorden')) for d in data]
+        if not filas:
+            return 0
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                actualizados = 0
+                for inicio in range(0, len(filas), page_size):
+                    psycopg2.extras.execute_values(
+                        cur,
+                        """
+                        UPDATE productos AS p
+                        SET nombre = v.nombre, precio = v.precio, stock = v.stock,
+                            punto_reorden = COALESCE(v.punto_reorden, p.punto_reorden), version = p.version + 1
+                        FROM (VALUES %s) AS v(id, nombre, precio, stock, punto_reorden)
+                        WHERE p.id = v.id;
+                        """,
+                        filas[inicio:inicio + page_size],
+                        template="(%s::integer, %s::varchar, %s::numeric, %s::integer, %s::integer)",
+                        page_size=page_size,
+                    )
+                    actualizados += cur.rowcount
+                conn.commit()
+                logging.info("Se han actualizado %s productos en bloque.", actualizados)
+                return actualizados
+        except psycopg2.Error as e:
+            logging.error("Error al actualizar %s productos en bloque: %s", len(filas), e)
+            return 0
+
+    def delete_many(self, ids: Iterable[int]) -> int:
+        """Elimina varios productos con una única sentencia `DELETE ... WHERE id = ANY(...)`."""
+        ids = list(ids)
+        if not ids:
+            return 0
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute("DELETE FROM productos WHERE id = ANY(%s);", (ids,))
+                conn.commit()
+                logging.info("Se han eliminado %s productos en bloque.", cur.rowcount)
+                return cur.rowcount
+        except psycopg2.Error as e:
+            logging.error("Error al eliminar %s productos en bloque: %s", len(ids), e)
+            return 0
+
+    def get_by_low_stock(self, umbral: int | None = None, limite: int | None = None) -> List[Producto]:
+        """
+        Obtiene productos con stock bajo, ordenados de menor a mayor stock.
+
+        Con `umbral` se devuelven los productos con stock <= umbral (índice `idx_productos_stock`).
+        Sin él, cada producto se compara con su propio `punto_reorden` (o `UMBRAL_STOCK_BAJO` si no
+        tiene), consulta que resuelve el índice parcial `idx_productos_reorden`.
+        """
         try:
-            with self.conn.cursor() as cur:
-                cur.execute("SELECT id, nombre, precio, stock FROM productos WHERE stock <= 5 ORDER BY stock;")
-                productos = [self._to_dict(cur, row) for row in cur.fetchall()]
-                logging.info(f"Se han obtenido {len(productos)} productos con stock bajo.")
+            with self._connection() as conn, conn.cursor() as cur:
+                if umbral is None:
+                    cur.execute(
+                        "SELECT id, nombre, precio, stock, punto_reorden, version FROM productos "
+                        f"WHERE stock <= COALESCE(punto_reorden, {UMBRAL_STOCK_BAJO}) ORDER BY stock, id LIMIT %s;",
+                        (limite,)
+                    )
+                else:
+                    cur.execute(
+                        "SELECT id, nombre, precio, stock, punto_reorden, version FROM productos WHERE stock <= %s ORDER BY stock, id LIMIT %s;",
+                        (umbral, limite)
+                    )
+                productos = list(map(self._row_factory(cur), cur.fetchall()))
+                logging.info("Se han obtenido %s productos con stock bajo.", len(productos))
                 return productos
         except psycopg2.Error as e:
-            logging.error(f"Error al obtener productos con stock bajo: {e}")
+            logging.error("Error al obtener productos con stock bajo: %s", e)
             return []
 
+    def get_inventory_summary(self, umbral: int | None = None, top: int = 5) -> Dict[str, Any]:
+        """Calcula valor total, bandas de stock y top-N por valor con una única consulta agregada."""
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    WITH top AS (
+                        SELECT id, nombre, precio, stock, precio * stock AS valor
+                        FROM productos ORDER BY precio * stock DESC, id LIMIT %(top)s
+                    )
+                    SELECT count(*),
+                           COALESCE(sum(stock), 0),
+                           COALESCE(sum(precio * stock), 0),
+                           count(*) FILTER (WHERE stock = 0),
+                           count(*) FILTER (WHERE stock > 0 AND stock <= COALESCE(%(umbral)s, punto_reorden, {UMBRAL_STOCK_BAJO})),
+                           count(*) FILTER (WHERE stock > COALESCE(%(umbral)s, punto_reorden, {UMBRAL_STOCK_BAJO})),
+                           (SELECT COALESCE(json_agg(top ORDER BY valor DESC, id), '[]'::json) FROM top)
+                    FROM productos;
+                    """,
+                    {"umbral": umbral, "top": top}
+                )
+                fila = cur.fetchone()
+                logging.info("Se ha calculado el resumen del inventario.")
+                return resumen_desde_fila(fila)
+        except psycopg2.Error as e:
+            logging.error("Error al calcular el resumen del inventario: %s", e)
+            return {}
+
+    def adjust_stock(self, id_producto: int, delta: int) -> Producto | None:
+        """Suma `delta` al stock con `stock = stock + delta`; la condición del WHERE impide dejarlo negativo."""
+        insuficiente = False
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE productos SET stock = stock + %(delta)s, version = version + 1
+                    WHERE id = %(id)s AND stock + %(delta)s >= 0
+                    RETURNING id, nombre, precio, stock, punto_reorden, version;
+                    """,
+                    {"id": id_producto, "delta": delta}
+                )
+                producto = self._to_producto(cur, cur.fetchone())
+                if producto is None:
+                    cur.execute("SELECT 1 FROM productos WHERE id = %s;", (id_producto,))
+                    insuficiente = cur.fetchone() is not None
+                conn.commit()
+        except psycopg2.Error as e:
+            logging.error("Error al ajustar el stock del producto con ID %s: %s", id_producto, e)
+            return None
+        if insuficiente:
+            logging.warning("Stock insuficiente para ajustar en %s el producto con ID %s.", delta, id_producto)
+            raise StockInsuficiente([id_producto])
+        if producto:
+            logging.info("Stock del producto con ID %s ajustado en %s (queda %s).", id_producto, delta, producto['stock'])
+        else:
+            logging.warning("Intento de ajustar el stock de un producto no existente con ID %s.", id_producto)
+        return producto
+
+    def apply_order(self, lineas: Iterable[Tuple[int, int]]) -> List[Producto]:
+        """
+        Aplica las líneas del pedido en una transacción: bloquea las filas con
+        `SELECT ... ORDER BY id FOR UPDATE`, comprueba el stock y las actualiza con un único
+        UPDATE ... FROM (VALUES ...).
+        """
+        deltas = agrupar_lineas(lineas)
+        if not deltas:
+            return []
+        ids = list(deltas)
+        inexistentes: List[int] = []
+        insuficientes: List[int] = []
+        try:
+            with self._connection() as conn, conn.cursor() as cur:
+                cur.execute("SELECT id, stock FROM productos WHERE id = ANY(%s) ORDER BY id FOR UPDATE;", (ids,))
+                actuales = dict(cur.fetchall())
+                inexistentes = [i for i in ids if i not in actuales]
+                insuficientes = [i for i in ids if i in actuales and actuales[i] + deltas[i] < 0]
+                if inexistentes or insuficientes:
+                    conn.rollback()
+                else:
+                    filas = psycopg2.extras.execute_values(
+                        cur,
+                        """
+                        UPDATE productos AS p SET stock = p.stock + v.delta, version = p.version + 1
+                        FROM (VALUES %s) AS v(id, delta)
+                        WHERE p.id = v.id
+                        RETURNING p.id, p.nombre, p.precio, p.stock, p.punto_reorden, p.version;
+                        """,
+                        list(deltas.items()),
+                        page_size=len(deltas),
+                        fetch=True,
+                    )
+                    conn.commit()
+                    crear = self._row_factory(cur)
+                    productos = sorted((crear(row) for row in filas), key=lambda p: p['id'])
+        except psycopg2.Error as e:
+            logging.error("Error al aplicar un pedido de %s productos: %s", len(deltas), e)
+            return []
+        if inexistentes:
+            logging.warning("Pedido rechazado: no existen los productos con ID %s.", inexistentes)
+            raise ValueError(f"No existen los productos con ID {', '.join(map(str, inexistentes))}.")
+        if insuficientes:
+            logging.warning("Pedido rechazado: stock insuficiente para los productos con ID %s.", insuficientes)
+            raise StockInsuficiente(insuficientes)
+        logging.info("Pedido aplicado sobre %s productos.", len(productos))
+        return productos
+
+    # Consultas COPY por formato de exportación. JSONL y TXT producen una sola columna de texto
+    # ya formateada; se emiten en modo CSV con delimitador y comillas de control (\x1f, \x1e)
+    # para que PostgreSQL no escape las barras invertidas como haría el formato TEXT.
+    _CONSULTAS_COPY = {
+        "csv": """
+            COPY (SELECT id, nombre, precio, stock, punto_reorden, version FROM productos ORDER BY id)
+            TO STDOUT WITH (FORMAT csv, HEADER);
+        """,
+        "jsonl": """
+            COPY (SELECT row_to_json(p)::text FROM (
+                SELECT id, nombre, precio, stock, punto_reorden, version FROM productos ORDER BY id
+            ) AS p)
+            TO STDOUT WITH (FORMAT csv, DELIMITER E'\\x1f', QUOTE E'\\x1e');
+        """,
+        "txt": """
+            COPY (SELECT format('ID: %s | %s | Precio: $%s | Stock: %s',
+                                id, replace(nombre, E'\\n', ' '), to_char(precio, 'FM99999990.00'), stock)
+                  FROM productos ORDER BY id)
+            TO STDOUT WITH (FORMAT csv, DELIMITER E'\\x1f', QUOTE E'\\x1e');
+        """,
+    }
+
+    def copy_to(self, destino: TextIO, formato: str = "csv") -> int:
+        """
+        Vuelca todos los productos en `destino` con `COPY ... TO STDOUT`.
+
+        PostgreSQL genera las líneas ya formateadas ("csv", "jsonl" o "txt") y psycopg2 las
+        escribe en el archivo a medida que llegan, sin pasar por filas de Python. Devuelve el
+        número de productos exportados. A diferencia del resto de operaciones, los errores se
+        propagan para que quien exporta pueda descartar el archivo incompleto.
+        """
+        consulta = self._CONSULTAS_COPY.get(formato)
+        if consulta is None:
+            raise ValueError(f"Formato de exportación no soportado: '{formato}'")
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.copy_expert(consulta, destino)
+            conn.rollback()
+            logging.info("Se han exportado %s productos con COPY (%s).", cur.rowcount, formato)
+            return cur.rowcount
+
+    def _cerrar_pool(self) -> bool:
+        """Cierra todas las conexiones del pool sin registrar nada; devuelve si había un pool abierto."""
+        if not self.pool:
+            return False
+        self.pool.closeall()
+        self.pool = None
+        return True
+
+    def close(self):
+        """Cierra todas las conexiones del pool."""
+        if self._cerrar_pool():
+            logging.info("Pool de conexiones a PostgreSQL cerrado.")
+
     def __del__(self):
-        """Cierra la conexión a la base de datos cuando el objeto es destruido."""
-        if self.conn:
-            self.conn.close()
-            logging.info("Conexión a PostgreSQL cerrada.")
+        """
+        Cierra el pool de conexiones cuando el objeto es destruido.
+
+        No registra nada: al terminar el intérprete el logging (y su cola) puede estar ya
+        detenido. Los puntos de entrada llaman a `close()` explícitamente antes de salir.
+        """
+        self._cerrar_pool()
@@ -0,0 +1,59 @@
+from collections.abc import Mapping
+from typing import Any, Iterator, Sequence
+
+class Producto(Mapping):
+    """
+    Fila de la tabla de productos.
+
+    Usa `__slots__` en lugar de un diccionario por instancia, por lo que ocupa varias veces
+    menos memoria en recorridos grandes. Se comporta como un mapeo de sólo lectura, así que el
+    código existente que usa `producto['nombre']`, `producto.get(...)` o `dict(producto)` sigue
+    funcionando; también se puede acceder a los campos como atributos (`producto.nombre`).
+
+    Es inmutable: asignar un atributo lanza AttributeError, de modo que la caché puede compartir
+    la misma instancia entre hilos. Para modificar un producto se usa el repositorio.
+    """
+    __slots__ = ("id", "nombre", "precio", "stock", "punto_reorden", "version")
+
+    def __init__(self, id: int, nombre: str, precio: Any, stock: int, punto_reorden: int | None = None, version: int = 1):
+        # Se asigna con los descriptores de los slots porque __setattr__ está bloqueado.
+        _asignar_id(self, id)
+        _asignar_nombre(self, nombre)
+        _asignar_precio(self, precio)
+        _asignar_stock(self, stock)
+        _asignar_punto_reorden(self, punto_reorden)
+        _asignar_version(self, version)
+
+    def __setattr__(self, nombre: str, valor: Any):
+        raise AttributeError(f"Producto es de sólo lectura: no se puede asignar '{nombre}'")
+
+    def __delattr__(self, nombre: str):
+        raise AttributeError(f"Producto es de sólo lectura: no se puede borrar '{nombre}'")
+
+    def __reduce__(self):
+        # copy y pickle reconstruyen el producto con el constructor en vez de asignar atributos.
+        return (Producto, tuple(getattr(self, campo) for campo in self.__slots__))
+
+    @classmethod
+    def desde_fila(cls, fila: Sequence[Any]) -> "Producto":
+        """Crea un Producto a partir de una fila con las columnas en el orden de `__slots__`."""
+        return cls(*fila)
+
+    def __getitem__(self, clave: str) -> Any:
+        if clave not in self.__slots__:
+            raise KeyError(clave)
+        return getattr(self, clave)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        return len(self.__slots__)
+
+    def __repr__(self) -> str:
+        campos = ", ".join(f"{campo}={getattr(self, campo)!r}" for campo in self.__slots__)
+        return f"Producto({campos})"
+
+
+(_asignar_id, _asignar_nombre, _asignar_precio,
+ _asignar_stock, _asignar_punto_reorden, _asignar_version) = (getattr(Producto, campo).__set__ for campo in Producto.__slots__)
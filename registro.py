@@ -0,0 +1,81 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+
+# Configuración del logging de la aplicación.
+# Los módulos sólo encolan los registros (QueueHandler); un hilo en segundo plano (QueueListener)
+# los formatea y los escribe en `operaciones.log` y en la consola, así que la latencia del disco
+# nunca frena a quien registra.
+
+FORMATO_TEXTO = '%(asctime)s - %(levelname)s - %(message)s'
+FORMATOS_LOG = ("texto", "json")
+
+
+class FormateadorJson(logging.Formatter):
+    """Formatea cada registro como un objeto JSON en una línea (JSON Lines)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entrada = {
+            "fecha": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+            "modulo": record.module,
+            "linea": record.lineno,
+            "hilo": record.threadName,
+        }
+        if record.exc_info:
+            entrada["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(entrada, ensure_ascii=False)
+
+
+def _manejador_archivo(archivo: str, rotacion: str, max_bytes: int, copias: int) -> logging.Handler:
+    """Crea el manejador del archivo de log con rotación por tamaño ("tamano") o diaria ("diaria")."""
+    if rotacion == "diaria":
+        return logging.handlers.TimedRotatingFileHandler(archivo, when="midnight", backupCount=copias, encoding="utf-8")
+    if rotacion == "tamano":
+        return logging.handlers.RotatingFileHandler(archivo, maxBytes=max_bytes, backupCount=copias, encoding="utf-8")
+    raise ValueError(f"Rotación de logs no soportada: '{rotacion}' (use 'tamano' o 'diaria').")
+
+
+def configurar_logging(archivo: str | None = "operaciones.log", nivel: int | str = logging.INFO,
+                       formato: str = "texto", rotacion: str = "tamano", max_bytes: int = 10 * 1024 * 1024,
+                       copias: int = 5, consola: bool = True) -> logging.handlers.QueueListener:
+    """
+    Configura el logger raíz con una cola y un hilo escritor, y devuelve el QueueListener.
+
+    :param archivo: Archivo de log (None para no escribir en disco).
+    :param nivel: Nivel mínimo; los mensajes por debajo no se formatean ni se encolan.
+    :param formato: "texto" (una línea legible) o "json" (JSON Lines, un objeto por línea).
+    :param rotacion: "tamano" rota al alcanzar `max_bytes`; "diaria", a medianoche.
+    :param copias: Número de archivos rotados que se conservan.
+    :param consola: Si también se escribe en la salida estándar.
+
+    El listener se detiene al salir del proceso, después de escribir los registros pendientes.
+    """
+    if formato not in FORMATOS_LOG:
+        raise ValueError(f"Formato de log no soportado: '{formato}' (use {', '.join(FORMATOS_LOG)})")
+    formateador = FormateadorJson() if formato == "json" else logging.Formatter(FORMATO_TEXTO)
+    destinos = []
+    if archivo:
+        destinos.append(_manejador_archivo(archivo, rotacion, max_bytes, copias))
+    if consola:
+        destinos.append(logging.StreamHandler(sys.stdout))
+    for destino in destinos:
+        destino.setFormatter(formateador)
+
+    cola: queue.SimpleQueue = queue.SimpleQueue()
+    raiz = logging.getLogger()
+    for manejador in list(raiz.handlers):
+        raiz.removeHandler(manejador)
+    raiz.addHandler(logging.handlers.QueueHandler(cola))
+    raiz.setLevel(nivel)
+
+    listener = logging.handlers.QueueListener(cola, *destinos, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
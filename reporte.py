@@ -0,0 +1,50 @@
+import argparse
+import json
+import logging
+import sys
+from typing import Any, Dict
+
+from exportador import serializar_json
+
+# La configuración del logger se realiza en el punto de entrada de la aplicación (main.py)
+
+
+def imprimir_resumen(resumen: Dict[str, Any]):
+    """Muestra por pantalla el resumen devuelto por `get_inventory_summary`."""
+    print(f"Productos: {resumen['total_productos']} | Unidades en stock: {resumen['unidades_totales']}")
+    print(f"Valor total del inventario: ${resumen['valor_total']:.2f}")
+    print(f"🔴 Sin stock: {resumen['sin_stock']} | 🟡 Stock bajo: {resumen['stock_bajo']} | 🟢 Stock OK: {resumen['stock_ok']}")
+    if resumen["top_por_valor"]:
+        print("\nProductos con mayor valor en stock:")
+        for posicion, p in enumerate(resumen["top_por_valor"], start=1):
+            print(f"{posicion}. ID: {p['id']} | {p['nombre']} | Stock: {p['stock']} | Valor: ${float(p['valor']):.2f}")
+
+
+def main():
+    """Punto de entrada para consultar el resumen del inventario sin pasar por el menú interactivo."""
+    parser = argparse.ArgumentParser(description="Muestra el valor del inventario, las bandas de stock y el top por valor.")
+    parser.add_argument("--umbral", type=int, default=None,
+                        help="Umbral de stock bajo (por defecto, el punto de reorden de cada producto)")
+    parser.add_argument("--top", type=int, default=5, help="Número de productos en el top por valor")
+    parser.add_argument("--json", action="store_true", help="Imprime el resumen como JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from main import crear_backend
+    try:
+        repo = crear_backend()
+    except (ConnectionError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    resumen = repo.get_inventory_summary(args.umbral, args.top)
+    if not resumen:
+        print("❌ No se pudo calcular el resumen del inventario.")
+        sys.exit(1)
+    if args.json:
+        print(json.dumps(resumen, ensure_ascii=False, default=serializar_json, indent=2))
+    else:
+        imprimir_resumen(resumen)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,68 @@
+import json
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+from producto import Producto
+
+# Umbral de stock bajo para los productos sin punto de reorden propio.
+UMBRAL_STOCK_BAJO = 5
+
+# Versión del esquema (tabla e índices) que crean los backends. Los backends la registran tras
+# aplicar el DDL y en los arranques siguientes lo omiten; hay que incrementarla al cambiar el DDL.
+VERSION_ESQUEMA = 2
+
+# Columnas que se pueden modificar con `patch`.
+CAMPOS_EDITABLES = ("nombre", "precio", "stock", "punto_reorden")
+
+class ConflictoDeVersion(Exception):
+    """El producto fue modificado por otro proceso desde que se leyó (control de concurrencia optimista)."""
+    pass
+
+class StockInsuficiente(Exception):
+    """Un ajuste dejaría el stock de algún producto por debajo de cero; no se modificó nada."""
+    def __init__(self, ids_producto: Iterable[int]):
+        self.ids_producto = sorted(ids_producto)
+        super().__init__(f"Stock insuficiente para los productos con ID {', '.join(map(str, self.ids_producto))}.")
+
+def validar_campos(campos: Dict[str, Any]):
+    """Lanza ValueError si `campos` incluye columnas que no se pueden modificar con `patch`."""
+    desconocidos = set(campos) - set(CAMPOS_EDITABLES)
+    if desconocidos:
+        raise ValueError(f"Campos no editables: {', '.join(sorted(desconocidos))}")
+
+def agrupar_lineas(lineas: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    """
+    Suma los deltas de las líneas de un pedido por producto y los devuelve ordenados por ID,
+    el orden en que los backends bloquean las filas para que dos pedidos no se interbloqueen.
+    """
+    deltas: Dict[int, int] = {}
+    for id_producto, delta in lineas:
+        if not isinstance(id_producto, int) or not isinstance(delta, int) or isinstance(delta, bool):
+            raise ValueError(f"Línea de pedido no válida: ({id_producto!r}, {delta!r})")
+        deltas[id_producto] = deltas.get(id_producto, 0) + delta
+    return dict(sorted(deltas.items()))
+
+def escapar_like(texto: str) -> str:
+    """Escapa los comodines de LIKE (con '\\' como carácter de escape) para buscar el texto literalmente."""
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def resumen_desde_fila(fila) -> Dict[str, Any]:
+    """
+    Arma el diccionario de `get_inventory_summary` a partir de la fila agregada que devuelven los
+    backends: (total, unidades, valor, sin_stock, stock_bajo, stock_ok, top), donde `top` es una
+    lista JSON (ya decodificada o como texto) de objetos con id, nombre, precio, stock y valor.
+    """
+    total, unidades, valor, sin_stock, stock_bajo, stock_ok, top = fila
+    if isinstance(top, str):
+        top = json.loads(top)
+    return {
+        "total_productos": total,
+        "unidades_totales": unidades,
+        "valor_total": valor,
+        "sin_stock": sin_stock or 0,
+        "stock_bajo": stock_bajo or 0,
+        "stock_ok": stock_ok or 0,
+        "top_por_valor": list(top or []),
+    }
 
 class ProductoRepository(ABC):
     """
@@ -8,23 +71,58 @@ class ProductoRepository(ABC):
     """
 
     @abstractmethod
-    def get_all(self) -> List[Dict[str, Any]]:
+    def get_all(self) -> List[Producto]:
         """Devuelve todos los productos."""
         pass
 
     @abstractmethod
-    def get_by_id(self, id_producto: int) -> Dict[str, Any] | None:
+    def iter_all(self, batch_size: int = 500) -> Iterator[Producto]:
+        """
+        Recorre todos los productos por lotes de `batch_size` sin cargarlos todos en memoria.
+
+        A diferencia del resto de operaciones, un error de la base de datos a mitad del recorrido
+        se registra y se propaga, para que un recorrido cortado no parezca completo.
+        """
+        pass
+
+    @abstractmethod
+    def get_page(self, after_id: int = 0, limit: int = 20) -> List[Producto]:
+        """Devuelve hasta `limit` productos con ID mayor que `after_id`, ordenados por ID (paginación keyset)."""
+        pass
+
+    @abstractmethod
+    def search_by_name(self, termino: str, limit: int = 20) -> List[Producto]:
+        """Devuelve hasta `limit` productos cuyo nombre empieza por `termino` (sin distinguir mayúsculas)."""
+        pass
+
+    @abstractmethod
+    def get_by_id(self, id_producto: int) -> Producto | None:
         """Devuelve un producto por su ID."""
         pass
 
     @abstractmethod
-    def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    def get_by_ids(self, ids: Iterable[int]) -> List[Producto]:
+        """Devuelve, ordenados por ID, los productos existentes entre `ids` en una sola consulta."""
+        pass
+
+    @abstractmethod
+    def create(self, data: Dict[str, Any]) -> Producto | None:
         """Crea un nuevo producto."""
         pass
 
     @abstractmethod
-    def update(self, id_producto: int, data: Dict[str, Any]) -> Dict[str, Any] | None:
-        """Actualiza un producto existente."""
+    def update(self, id_producto: int, data: Dict[str, Any]) -> Producto | None:
+        """Actualiza un producto existente (si 'punto_reorden' falta o es None, se conserva el actual)."""
+        pass
+
+    @abstractmethod
+    def patch(self, id_producto: int, version_esperada: int | None = None, **campos) -> Producto | None:
+        """
+        Modifica sólo los `campos` indicados (ver CAMPOS_EDITABLES) en una única sentencia.
+
+        Devuelve el producto actualizado, o None si no existe. Si se indica `version_esperada` y
+        la versión actual es otra, lanza ConflictoDeVersion sin modificar nada.
+        """
         pass
 
     @abstractmethod
@@ -33,6 +131,60 @@ class ProductoRepository(ABC):
         pass
 
     @abstractmethod
-    def get_by_low_stock(self) -> List[Dict[str, Any]]:
-        """Muestra los productos con Stock bajo (< 5 unds)."""
-        pass
\ No newline at end of file
+    def create_many(self, data: Iterable[Dict[str, Any]]) -> List[int]:
+        """Crea varios productos en una sola transacción y devuelve sus IDs en el mismo orden."""
+        pass
+
+    @abstractmethod
+    def update_many(self, data: Iterable[Dict[str, Any]]) -> int:
+        """Actualiza varios productos (cada diccionario incluye su 'id') y devuelve cuántos cambiaron."""
+        pass
+
+    @abstractmethod
+    def delete_many(self, ids: Iterable[int]) -> int:
+        """Elimina varios productos por ID y devuelve cuántos se eliminaron."""
+        pass
+
+    @abstractmethod
+    def get_by_low_stock(self, umbral: int | None = None, limite: int | None = None) -> List[Producto]:
+        """
+        Devuelve hasta `limite` productos con stock bajo, de menor a mayor stock.
+
+        Con `umbral`, son los productos con stock <= umbral. Sin él, los que tienen stock <= a su
+        `punto_reorden`, o <= UMBRAL_STOCK_BAJO si no tienen uno definido.
+        """
+        pass
+
+    @abstractmethod
+    def get_inventory_summary(self, umbral: int | None = None, top: int = 5) -> Dict[str, Any]:
+        """
+        Calcula en la base de datos, con una sola consulta, el resumen del inventario.
+
+        Devuelve un diccionario con `total_productos`, `unidades_totales`, `valor_total`
+        (suma de precio * stock), el número de productos por banda de stock (`sin_stock`,
+        `stock_bajo`, `stock_ok`, con el mismo criterio que `get_by_low_stock`) y `top_por_valor`,
+        la lista de los `top` productos con mayor valor en stock.
+        """
+        pass
+
+    @abstractmethod
+    def adjust_stock(self, id_producto: int, delta: int) -> Producto | None:
+        """
+        Suma `delta` (negativo para descontar) al stock con una única sentencia atómica.
+
+        Devuelve el producto actualizado, o None si no existe. Si el stock quedaría negativo
+        lanza StockInsuficiente sin modificar nada.
+        """
+        pass
+
+    @abstractmethod
+    def apply_order(self, lineas: Iterable[Tuple[int, int]]) -> List[Producto]:
+        """
+        Aplica en una sola transacción los ajustes de stock de un pedido, pares (id, delta).
+
+        Los deltas de un mismo producto se suman y las filas se bloquean en orden de ID, así que
+        pedidos concurrentes no se interbloquean ni venden más de lo que hay. O se aplican todas
+        las líneas o ninguna: lanza StockInsuficiente si algún producto quedaría con stock
+        negativo y ValueError si alguno no existe. Devuelve los productos actualizados por ID.
+        """
+        pass
@@ -0,0 +1,113 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, AsyncIterator, Iterable, Tuple
+from producto import Producto
+
+class AsyncProductoRepository(ABC):
+    """
+    Versión asíncrona del contrato `repositorio.ProductoRepository`.
+
+    Tiene los mismos métodos y la misma semántica, pero cada uno es una corrutina, de modo que
+    un único bucle de eventos puede tener cientos de consultas en curso sin un hilo por consulta.
+    """
+
+    @abstractmethod
+    async def get_all(self) -> List[Producto]:
+        """Devuelve todos los productos."""
+        pass
+
+    @abstractmethod
+    def iter_all(self, batch_size: int = 500) -> AsyncIterator[Producto]:
+        """Recorre todos los productos por lotes de `batch_size` (se usa con `async for`)."""
+        pass
+
+    @abstractmethod
+    async def get_page(self, after_id: int = 0, limit: int = 20) -> List[Producto]:
+        """Devuelve hasta `limit` productos con ID mayor que `after_id`, ordenados por ID (paginación keyset)."""
+        pass
+
+    @abstractmethod
+    async def search_by_name(self, termino: str, limit: int = 20) -> List[Producto]:
+        """Devuelve hasta `limit` productos cuyo nombre empieza por `termino` (sin distinguir mayúsculas)."""
+        pass
+
+    @abstractmethod
+    async def get_by_id(self, id_producto: int) -> Producto | None:
+        """Devuelve un producto por su ID."""
+        pass
+
+    @abstractmethod
+    async def get_by_ids(self, ids: Iterable[int]) -> List[Producto]:
+        """Devuelve, ordenados por ID, los productos existentes entre `ids` en una sola consulta."""
+        pass
+
+    @abstractmethod
+    async def create(self, data: Dict[str, Any]) -> Producto | None:
+        """Crea un nuevo producto."""
+        pass
+
+    @abstractmethod
+    async def update(self, id_producto: int, data: Dict[str, Any]) -> Producto | None:
+        """Actualiza un producto existente (si 'punto_reorden' falta o es None, se conserva el actual)."""
+        pass
+
+    @abstractmethod
+    async def patch(self, id_producto: int, version_esperada: int | None = None, **campos) -> Producto | None:
+        """Modifica sólo los `campos` indicados (ver `ProductoRepository.patch`)."""
+        pass
+
+    @abstractmethod
+    async def delete(self, id_producto: int) -> bool:
+        """Elimina un producto y devuelve True si tuvo éxito."""
+        pass
+
+    @abstractmethod
+    async def create_many(self, data: Iterable[Dict[str, Any]]) -> List[int]:
+        """Crea varios productos en una sola transacción y devuelve sus IDs en el mismo orden."""
+        pass
+
+    @abstractmethod
+    async def update_many(self, data: Iterable[Dict[str, Any]]) -> int:
+        """Actualiza varios productos (cada diccionario incluye su 'id') y devuelve cuántos cambiaron."""
+        pass
+
+    @abstractmethod
+    async def delete_many(self, ids: Iterable[int]) -> int:
+        """Elimina varios productos por ID y devuelve cuántos se eliminaron."""
+        pass
+
+    @abstractmethod
+    async def get_by_low_stock(self, umbral: int | None = None, limite: int | None = None) -> List[Producto]:
+        """Devuelve hasta `limite` productos con stock bajo (ver `ProductoRepository.get_by_low_stock`)."""
+        pass
+
+    @abstractmethod
+    async def get_inventory_summary(self, umbral: int | None = None, top: int = 5) -> Dict[str, Any]:
+        """Calcula el resumen del inventario (ver `ProductoRepository.get_inventory_summary`)."""
+        pass
+
+    @abstractmethod
+    async def adjust_stock(self, id_producto: int, delta: int) -> Producto | None:
+        """Suma `delta` al stock de forma atómica (ver `ProductoRepository.adjust_stock`)."""
+        pass
+
+    @abstractmethod
+    async def apply_order(self, lineas: Iterable[Tuple[int, int]]) -> List[Producto]:
+        """Aplica un pedido en una sola transacción (ver `ProductoRepository.apply_order`)."""
+        pass
+
+
+async def obtener_por_ids(repo: AsyncProductoRepository, ids: Iterable[int], concurrencia: int = 100) -> List[Producto | None]:
+    """
+    Busca muchos productos por ID a la vez con `asyncio.gather`.
+
+    Como mucho `concurrencia` consultas quedan en curso simultáneamente, para no acaparar todo el
+    pool de conexiones. Devuelve los resultados en el mismo orden que `ids` (None si no existe).
+    """
+    limite = asyncio.Semaphore(concurrencia)
+
+    async def buscar(id_producto: int) -> Producto | None:
+        async with limite:
+            return await repo.get_by_id(id_producto)
+
+    return await asyncio.gather(*(buscar(id_producto) for id_producto in ids))
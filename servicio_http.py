@@ -0,0 +1,527 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import re
+import selectors
+import socket
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+from exportador import serializar_json
+from importador import validar_producto
+from repositorio import CAMPOS_EDITABLES, ConflictoDeVersion, ProductoRepository, StockInsuficiente
+
+# Servicio HTTP/JSON sobre el repositorio de productos, para los terminales de venta y la tienda web.
+#
+#   GET    /salud                               Comprobación de vida
+#   GET    /productos?after_id=0&limit=50       Página de productos (paginación por ID)
+#   GET    /productos?nombre=ssd&limit=20       Búsqueda por prefijo de nombre
+#   GET    /productos?ids=1,2,3                 Varios productos por ID
+#   GET    /productos/<id>                      Un producto
+#   POST   /productos                           Crea un producto
+#   PUT    /productos/<id>                      Reemplaza nombre, precio, stock y punto de reorden
+#   PATCH  /productos/<id>                      Modifica sólo los campos enviados ("version" opcional)
+#   DELETE /productos/<id>                      Elimina un producto
+#   POST   /productos/<id>/ajuste               Suma {"delta": n} al stock de forma atómica
+#   POST   /pedidos                             Aplica {"lineas": [{"id": 1, "delta": -2}, ...]} en una transacción
+#   GET    /productos/stock-bajo?umbral=&limite=
+#   GET    /inventario/resumen?umbral=&top=
+#   GET    /inventario/export                   Todo el inventario en JSON Lines, enviado por partes
+#
+#   python servicio_http.py --puerto 8080 --hilos 64
+
+# Límite de productos por página en los listados.
+LIMITE_MAXIMO = 1000
+# Tamaño máximo del cuerpo de una petición.
+MAX_CUERPO = 1024 * 1024
+# Bytes acumulados antes de enviar cada parte de una respuesta por partes.
+TAMANO_PARTE = 64 * 1024
+# Segundos que una conexión keep-alive puede quedar inactiva antes de cerrarla. Mientras espera
+# no ocupa ningún hilo: la vigila el selector del servidor.
+ESPERA_KEEP_ALIVE = 15
+# Segundos entre volcados de las métricas a METRICAS_ARCHIVO mientras el servicio está en marcha.
+INTERVALO_METRICAS = 15
+
+
+class ErrorHttp(Exception):
+    """Error que se devuelve al cliente con el código de estado indicado."""
+    def __init__(self, estado: HTTPStatus, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+        self.mensaje = mensaje
+
+
+def _serializar(valor: Any):
+    """Convierte a tipos JSON los Producto (mapeos) y los precios Decimal."""
+    if isinstance(valor, Mapping):
+        return dict(valor)
+    return serializar_json(valor)
+
+
+def _a_json(valor: Any) -> bytes:
+    return json.dumps(valor, ensure_ascii=False, default=_serializar).encode("utf-8")
+
+
+def _validar_campos_parciales(cuerpo: Dict[str, Any]) -> Dict[str, Any]:
+    """Valida los campos enviados en un PATCH (sólo los presentes) y los devuelve normalizados."""
+    campos: Dict[str, Any] = {}
+    for campo, valor in cuerpo.items():
+        if campo not in CAMPOS_EDITABLES:
+            raise ErrorHttp(HTTPStatus.BAD_REQUEST, f"Campo no editable: '{campo}'")
+        if campo == "nombre":
+            if not isinstance(valor, str) or not valor.strip():
+                raise ErrorHttp(HTTPStatus.BAD_REQUEST, "'nombre' no puede estar vacío")
+            valor = valor.strip()
+        elif campo == "punto_reorden" and valor is None:
+            pass
+        elif isinstance(valor, bool) or not isinstance(valor, (int, float) if campo == "precio" else int) or valor < 0:
+            tipo = "un número" if campo == "precio" else "un número entero"
+            raise ErrorHttp(HTTPStatus.BAD_REQUEST, f"'{campo}' debe ser {tipo} no negativo")
+        campos[campo] = valor
+    return campos
+
+
+def _entero(parametros: Dict[str, List[str]], nombre: str, defecto: int | None = None,
+            minimo: int = 0, maximo: int | None = None) -> int | None:
+    """Lee un parámetro entero de la query string, validando su rango."""
+    valores = parametros.get(nombre)
+    if not valores or valores[-1] == "":
+        return defecto
+    try:
+        valor = int(valores[-1])
+    except ValueError:
+        raise ErrorHttp(HTTPStatus.BAD_REQUEST, f"'{nombre}' debe ser un número entero")
+    if valor < minimo or (maximo is not None and valor > maximo):
+        limites = f"entre {minimo} y {maximo}" if maximo is not None else f"mayor o igual que {minimo}"
+        raise ErrorHttp(HTTPStatus.BAD_REQUEST, f"'{nombre}' debe estar {limites}")
+    return valor
+
+
+class ManejadorInventario(BaseHTTPRequestHandler):
+    """Atiende las peticiones HTTP traduciéndolas a llamadas a `repo`."""
+    protocol_version = "HTTP/1.1"
+    server_version = "Inventario/1.0"
+    # Segundos que se espera a un cliente que deja una petición a medias (ocupa un hilo del pool).
+    timeout = 5
+    # Las cabeceras y el cuerpo se escriben por separado; sin TCP_NODELAY, Nagle y el ACK
+    # diferido del cliente añaden ~40 ms a cada respuesta en conexiones keep-alive.
+    disable_nagle_algorithm = True
+    repo: ProductoRepository
+
+    RUTAS = [
+        ("GET", re.compile(r"/salud"), "salud"),
+        ("GET", re.compile(r"/productos"), "listar"),
+        ("POST", re.compile(r"/productos"), "crear"),
+        ("GET", re.compile(r"/productos/stock-bajo"), "stock_bajo"),
+        ("GET", re.compile(r"/productos/(\d+)"), "obtener"),
+        ("PUT", re.compile(r"/productos/(\d+)"), "reemplazar"),
+        ("PATCH", re.compile(r"/productos/(\d+)"), "modificar"),
+        ("DELETE", re.compile(r"/productos/(\d+)"), "eliminar"),
+        ("POST", re.compile(r"/productos/(\d+)/ajuste"), "ajustar_stock"),
+        ("POST", re.compile(r"/pedidos"), "aplicar_pedido"),
+        ("GET", re.compile(r"/inventario/resumen"), "resumen"),
+        ("GET", re.compile(r"/inventario/export"), "exportar"),
+    ]
+
+    def __init__(self, request, client_address, server):
+        # A diferencia de BaseRequestHandler, no atiende la conexión al crearse: el servidor llama a
+        # `atender()` cada vez que la conexión tiene una petición lista.
+        self.request = request
+        self.client_address = client_address
+        self.server = server
+        self.setup()
+
+    def atender(self) -> bool:
+        """
+        Atiende las peticiones que ya están disponibles en la conexión (normalmente una) y devuelve
+        True si la conexión sigue abierta para más peticiones.
+        """
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self._hay_datos_pendientes():
+            self.handle_one_request()
+        return not self.close_connection
+
+    def _hay_datos_pendientes(self) -> bool:
+        """Indica, sin bloquear, si el cliente ya envió otra petición (p. ej. peticiones encadenadas)."""
+        self.connection.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    # --- Infraestructura ---
+
+    def do_GET(self):
+        self._despachar("GET")
+
+    def do_POST(self):
+        self._despachar("POST")
+
+    def do_PUT(self):
+        self._despachar("PUT")
+
+    def do_PATCH(self):
+        self._despachar("PATCH")
+
+    def do_DELETE(self):
+        self._despachar("DELETE")
+
+    def _despachar(self, metodo: str):
+        url = urlsplit(self.path)
+        ruta = url.path.rstrip("/") or "/"
+        parametros = parse_qs(url.query)
+        metodos_ruta = []
+        self._cuerpo_leido = False
+        try:
+            for metodo_ruta, patron, accion in self.RUTAS:
+                coincidencia = patron.fullmatch(ruta)
+                if coincidencia is None:
+                    continue
+                if metodo_ruta != metodo:
+                    metodos_ruta.append(metodo_ruta)
+                    continue
+                getattr(self, accion)(parametros, *map(int, coincidencia.groups()))
+                return
+            if metodos_ruta:
+                raise ErrorHttp(HTTPStatus.METHOD_NOT_ALLOWED, f"Método no permitido (use {', '.join(metodos_ruta)})")
+            raise ErrorHttp(HTTPStatus.NOT_FOUND, "Recurso no encontrado")
+        except ErrorHttp as e:
+            if not self._cuerpo_leido and self.headers.get("Content-Length", "0") != "0":
+                # El cuerpo quedó sin leer en el socket: la conexión no se puede reutilizar.
+                self.close_connection = True
+            self._responder(e.estado, {"error": e.mensaje})
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except Exception as e:
+            logging.error("Error inesperado en %s %s: %s", metodo, self.path, e)
+            self._responder(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Error interno del servidor"})
+
+    def _responder(self, estado: HTTPStatus, cuerpo: Any = None):
+        self.send_response(estado)
+        if cuerpo is None:
+            self.end_headers()
+            return
+        datos = _a_json(cuerpo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _leer_json(self) -> Dict[str, Any]:
+        try:
+            longitud = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            raise ErrorHttp(HTTPStatus.BAD_REQUEST, "Content-Length no válido")
+        if longitud < 0:
+            self.close_connection = True
+            raise ErrorHttp(HTTPStatus.BAD_REQUEST, "Content-Length no válido")
+        if longitud > MAX_CUERPO:
+            self.close_connection = True
+            raise ErrorHttp(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Cuerpo de la petición demasiado grande")
+        datos = self.rfile.read(longitud)
+        self._cuerpo_leido = True
+        try:
+            cuerpo = json.loads(datos or b"{}")
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ErrorHttp(HTTPStatus.BAD_REQUEST, "El cuerpo debe ser JSON válido")
+        if not isinstance(cuerpo, dict):
+            raise ErrorHttp(HTTPStatus.BAD_REQUEST, "El cuerpo debe ser un objeto JSON")
+        return cuerpo
+
+    def _validar_producto(self, cuerpo: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return validar_producto(cuerpo)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ErrorHttp(HTTPStatus.BAD_REQUEST, f"Producto no válido: {e}")
+
+    def log_message(self, formato, *args):
+        logging.debug("%s - " + formato, self.address_string(), *args)
+
+    # --- Endpoints ---
+
+    def salud(self, parametros):
+        self._responder(HTTPStatus.OK, {"estado": "ok"})
+
+    def listar(self, parametros):
+        limite = _entero(parametros, "limit", 50, 1, LIMITE_MAXIMO)
+        if "ids" in parametros:
+            try:
+                ids = [int(i) for i in parametros["ids"][-1].split(",") if i.strip()]
+            except ValueError:
+                raise ErrorHttp(HTTPStatus.BAD_REQUEST, "'ids' debe ser una lista de enteros separados por comas")
+            if len(ids) > LIMITE_MAXIMO:
+                raise ErrorHttp(HTTPStatus.BAD_REQUEST, f"Como máximo {LIMITE_MAXIMO} IDs por petición")
+            self._responder(HTTPStatus.OK, {"productos": self.repo.get_by_ids(ids)})
+            return
+        if "nombre" in parametros:
+            productos = self.repo.search_by_name(parametros["nombre"][-1], limite)
+            self._responder(HTTPStatus.OK, {"productos": productos})
+            return
+        after_id = _entero(parametros, "after_id", 0)
+        productos = self.repo.get_page(after_id=after_id, limit=limite)
+        siguiente = productos[-1]['id'] if len(productos) == limite else None
+        self._responder(HTTPStatus.OK, {"productos": productos, "siguiente_after_id": siguiente})
+
+    def obtener(self, parametros, id_producto: int):
+        producto = self.repo.get_by_id(id_producto)
+        if producto is None:
+            raise ErrorHttp(HTTPStatus.NOT_FOUND, f"Producto {id_producto} no encontrado")
+        self._responder(HTTPStatus.OK, producto)
+
+    def crear(self, parametros):
+        producto = self.repo.create(self._validar_producto(self._leer_json()))
+        if producto is None:
+            raise ErrorHttp(HTTPStatus.INTERNAL_SERVER_ERROR, "No se pudo crear el producto")
+        self._responder(HTTPStatus.CREATED, producto)
+
+    def reemplazar(self, parametros, id_producto: int):
+        producto = self.repo.update(id_producto, self._validar_producto(self._leer_json()))
+        if producto is None:
+            raise ErrorHttp(HTTPStatus.NOT_FOUND, f"Producto {id_producto} no encontrado")
+        self._responder(HTTPStatus.OK, producto)
+
+    def modificar(self, parametros, id_producto: int):
+        cuerpo = self._leer_json()
+        version = cuerpo.pop("version", None)
+        if version is not None and (isinstance(version, bool) or not isinstance(version, int)):
+            raise ErrorHttp(HTTPStatus.BAD_REQUEST, "'version' debe ser un número entero")
+        campos = _validar_campos_parciales(cuerpo)
+        if not campos:
+            raise ErrorHttp(HTTPStatus.BAD_REQUEST, "No se indicó ningún campo a modificar")
+        try:
+            producto = self.repo.patch(id_producto, version_esperada=version, **campos)
+        except ConflictoDeVersion:
+            raise ErrorHttp(HTTPStatus.CONFLICT, f"El producto {id_producto} fue modificado (versión distinta de {version})")
+        if producto is None:
+            raise ErrorHttp(HTTPStatus.NOT_FOUND, f"Producto {id_producto} no encontrado")
+        self._responder(HTTPStatus.OK, producto)
+
+    def eliminar(self, parametros, id_producto: int):
+        if not self.repo.delete(id_producto):
+            raise ErrorHttp(HTTPStatus.NOT_FOUND, f"Producto {id_producto} no encontrado")
+        self._responder(HTTPStatus.NO_CONTENT)
+
+    def ajustar_stock(self, parametros, id_producto: int):
+        delta = self._leer_json().get("delta")
+        if isinstance(delta, bool) or not isinstance(delta, int):
+            raise ErrorHttp(HTTPStatus.BAD_REQUEST, "'delta' debe ser un número entero")
+        try:
+            producto = self.repo.adjust_stock(id_producto, delta)
+        except StockInsuficiente:
+            raise ErrorHttp(HTTPStatus.CONFLICT, f"Stock insuficiente en el producto {id_producto}")
+        if producto is None:
+            raise ErrorHttp(HTTPStatus.NOT_FOUND, f"Producto {id_producto} no encontrado")
+        self._responder(HTTPStatus.OK, producto)
+
+    def aplicar_pedido(self, parametros):
+        lineas = self._leer_json().get("lineas")
+        if not isinstance(lineas, list) or not lineas:
+            raise ErrorHttp(HTTPStatus.BAD_REQUEST, "'lineas' debe ser una lista no vacía")
+        try:
+            productos = self.repo.apply_order((linea["id"], linea["delta"]) for linea in lineas)
+        except (KeyError, TypeError):
+            raise ErrorHttp(HTTPStatus.BAD_REQUEST, "Cada línea debe tener 'id' y 'delta'")
+        except StockInsuficiente as e:
+            raise ErrorHttp(HTTPStatus.CONFLICT, str(e))
+        except ValueError as e:
+            raise ErrorHttp(HTTPStatus.BAD_REQUEST, str(e))
+        if not productos:
+            raise ErrorHttp(HTTPStatus.INTERNAL_SERVER_ERROR, "No se pudo aplicar el pedido")
+        self._responder(HTTPStatus.OK, {"productos": productos})
+
+    def stock_bajo(self, parametros):
+        umbral = _entero(parametros, "umbral")
+        limite = _entero(parametros, "limite", LIMITE_MAXIMO, 1, LIMITE_MAXIMO)
+        self._responder(HTTPStatus.OK, {"productos": self.repo.get_by_low_stock(umbral=umbral, limite=limite)})
+
+    def resumen(self, parametros):
+        resumen = self.repo.get_inventory_summary(_entero(parametros, "umbral"), _entero(parametros, "top", 5, 0, 100))
+        if not resumen:
+            raise ErrorHttp(HTTPStatus.INTERNAL_SERVER_ERROR, "No se pudo calcular el resumen del inventario")
+        self._responder(HTTPStatus.OK, resumen)
+
+    def exportar(self, parametros):
+        """Envía todo el inventario en JSON Lines con codificación por partes, sin cargarlo en memoria."""
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        buffer: List[bytes] = []
+        acumulado = 0
+        try:
+            for producto in self.repo.iter_all():
+                linea = _a_json(dict(producto)) + b"\n"
+                buffer.append(linea)
+                acumulado += len(linea)
+                if acumulado >= TAMANO_PARTE:
+                    self._enviar_parte(b"".join(buffer))
+                    buffer.clear()
+                    acumulado = 0
+            if buffer:
+                self._enviar_parte(b"".join(buffer))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except Exception as e:
+            # Las cabeceras ya se enviaron: se corta la conexión sin la parte final para que el
+            # cliente sepa que la respuesta está incompleta.
+            logging.error("Error al exportar el inventario por HTTP: %s", e)
+            self.close_connection = True
+
+    def _enviar_parte(self, datos: bytes):
+        self.wfile.write(b"%X\r\n%s\r\n" % (len(datos), datos))
+
+
+class ServidorInventario(ThreadingHTTPServer):
+    """
+    Servidor HTTP que atiende las peticiones con un pool fijo de `hilos` trabajadores.
+
+    Un hilo sólo se ocupa mientras atiende una petición. Entre peticiones, las conexiones
+    keep-alive quedan en un selector (hilo "http-selector") que las devuelve al pool cuando llega
+    la siguiente petición y las cierra tras `espera_keep_alive` segundos de inactividad, así que
+    el número de terminales conectados no está limitado por el número de hilos.
+    """
+    request_queue_size = 128
+
+    def __init__(self, direccion: tuple, repo: ProductoRepository, hilos: int = 32,
+                 espera_keep_alive: float = ESPERA_KEEP_ALIVE):
+        manejador = type("Manejador", (ManejadorInventario,), {"repo": repo})
+        super().__init__(direccion, manejador)
+        self.espera_keep_alive = espera_keep_alive
+        self._trabajadores = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="http")
+        self._selector = selectors.DefaultSelector()
+        self._devueltas: queue.SimpleQueue = queue.SimpleQueue()
+        self._aviso_lectura, self._aviso_escritura = socket.socketpair()
+        self._aviso_lectura.setblocking(False)
+        self._selector.register(self._aviso_lectura, selectors.EVENT_READ)
+        self._cerrado = False
+        self._hilo_selector = threading.Thread(target=self._vigilar_inactivas, name="http-selector", daemon=True)
+        self._hilo_selector.start()
+
+    def process_request(self, request, client_address):
+        self._trabajadores.submit(self._atender, None, request, client_address)
+
+    def _atender(self, manejador: ManejadorInventario | None, request=None, client_address=None):
+        """Atiende la petición pendiente en el pool y devuelve la conexión al selector si sigue abierta."""
+        if manejador is not None:
+            request, client_address = manejador.request, manejador.client_address
+        try:
+            if manejador is None:
+                manejador = self.RequestHandlerClass(request, client_address, self)
+            if manejador.atender():
+                self._devueltas.put(manejador)
+                self._aviso_escritura.send(b"\0")
+                return
+        except Exception:
+            self.handle_error(request, client_address)
+        self._cerrar(manejador, request)
+
+    def _cerrar(self, manejador: ManejadorInventario | None, request):
+        try:
+            if manejador is not None:
+                manejador.finish()
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def _vigilar_inactivas(self):
+        """Bucle del selector: reparte las conexiones con datos y cierra las inactivas."""
+        proxima_revision = time.monotonic() + 1.0
+        while not self._cerrado:
+            for clave, _ in self._selector.select(timeout=1.0):
+                if clave.fileobj is self._aviso_lectura:
+                    try:
+                        self._aviso_lectura.recv(4096)
+                    except BlockingIOError:
+                        pass
+                    continue
+                self._selector.unregister(clave.fileobj)
+                self._trabajadores.submit(self._atender, clave.data[0])
+            while True:
+                try:
+                    manejador = self._devueltas.get_nowait()
+                except queue.Empty:
+                    break
+                limite = time.monotonic() + self.espera_keep_alive
+                self._selector.register(manejador.request, selectors.EVENT_READ, (manejador, limite))
+            ahora = time.monotonic()
+            if ahora < proxima_revision:
+                continue
+            proxima_revision = ahora + 1.0
+            for clave in list(self._selector.get_map().values()):
+                if clave.data is not None and clave.data[1] <= ahora:
+                    self._selector.unregister(clave.fileobj)
+                    self._cerrar(clave.data[0], clave.fileobj)
+
+    def server_close(self):
+        super().server_close()
+        self._cerrado = True
+        self._aviso_escritura.send(b"\0")
+        self._hilo_selector.join()
+        for clave in list(self._selector.get_map().values()):
+            if clave.data is not None:
+                self._cerrar(clave.data[0], clave.fileobj)
+        while not self._devueltas.empty():
+            manejador = self._devueltas.get_nowait()
+            self._cerrar(manejador, manejador.request)
+        self._selector.close()
+        self._aviso_lectura.close()
+        self._aviso_escritura.close()
+        self._trabajadores.shutdown(wait=False, cancel_futures=True)
+
+
+def _volcar_periodicamente(volcar: Callable[[], None], intervalo: float, detener: threading.Event):
+    """Llama a `volcar` cada `intervalo` segundos hasta que se activa `detener`."""
+    while not detener.wait(intervalo):
+        volcar()
+
+
+def main():
+    """Punto de entrada del servicio HTTP; usa el backend, la caché y las métricas configurados en el entorno."""
+    from main import cerrar_repositorio, configurar_logging_desde_entorno, obtener_repositorio, volcar_metricas
+
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON del inventario.")
+    parser.add_argument("--host", default=os.getenv("HTTP_HOST", "127.0.0.1"))
+    parser.add_argument("--puerto", type=int, default=int(os.getenv("HTTP_PUERTO", "8080")))
+    parser.add_argument("--hilos", type=int, default=int(os.getenv("HTTP_HILOS", "32")),
+                        help="Peticiones atendidas en paralelo")
+    parser.add_argument("--espera-keep-alive", type=float,
+                        default=float(os.getenv("HTTP_ESPERA_KEEP_ALIVE", str(ESPERA_KEEP_ALIVE))),
+                        help="Segundos antes de cerrar una conexión keep-alive inactiva")
+    args = parser.parse_args()
+
+    configurar_logging_desde_entorno()
+    servidor = ServidorInventario((args.host, args.puerto), obtener_repositorio(), args.hilos,
+                                  args.espera_keep_alive)
+    logging.info("Servicio HTTP escuchando en http://%s:%s con %s hilos.", args.host, servidor.server_port, args.hilos)
+    detener = threading.Event()
+    if os.getenv("METRICAS_ARCHIVO", "").strip():
+        intervalo = float(os.getenv("METRICAS_INTERVALO", str(INTERVALO_METRICAS)))
+        threading.Thread(target=_volcar_periodicamente, args=(volcar_metricas, intervalo, detener),
+                         name="volcado-metricas", daemon=True).start()
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        detener.set()
+        servidor.server_close()
+        volcar_metricas()
+        cerrar_repositorio()
+        logging.info("Servicio HTTP detenido.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,521 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Sequence, Tuple
+from metricas import MonitorConsultas
+from producto import Producto
+from repositorio import ProductoRepository, ConflictoDeVersion, StockInsuficiente, UMBRAL_STOCK_BAJO, VERSION_ESQUEMA, agrupar_lineas, escapar_like, resumen_desde_fila, validar_campos
+import logging
+
+# La configuración del logger se realiza en el punto de entrada de la aplicación (main.py)
+
+class _ConexionMonitorizada(sqlite3.Connection):
+    """Conexión que informa a un `MonitorConsultas` de la duración de cada sentencia que ejecuta."""
+    monitor: MonitorConsultas
+
+    def execute(self, consulta, parametros=()):
+        inicio = time.perf_counter()
+        error = False
+        try:
+            return super().execute(consulta, parametros)
+        except sqlite3.Error:
+            error = True
+            raise
+        finally:
+            self.monitor.registrar(time.perf_counter() - inicio, error, lambda: consulta)
+
+    def executemany(self, consulta, parametros):
+        inicio = time.perf_counter()
+        error = False
+        try:
+            return super().executemany(consulta, parametros)
+        except sqlite3.Error:
+            error = True
+            raise
+        finally:
+            self.monitor.registrar(time.perf_counter() - inicio, error, lambda: consulta)
+
+class SqliteProductoRepository(ProductoRepository):
+    """
+    Implementación del repositorio de productos sobre un archivo SQLite local.
+
+    Pensada para tiendas que funcionan en un solo equipo: no necesita servidor ni red. La base
+    de datos se abre en modo WAL, de modo que las lecturas no bloquean a las escrituras, y cada
+    hilo usa su propia conexión (las sentencias quedan preparadas en la caché de cada conexión).
+    """
+    def __init__(self, ruta: str = "hardware_shop.db", monitor: MonitorConsultas | None = None):
+        """
+        Abre (o crea) la base de datos SQLite.
+
+        :param ruta: Ruta del archivo de base de datos, o ":memory:" para una base temporal.
+            Con ":memory:" todos los hilos comparten una única conexión.
+        :param monitor: Si se indica, cada sentencia SQL se cronometra (y las lentas se registran);
+            sin él se usa la conexión normal de sqlite3, sin coste añadido.
+        """
+        self.ruta = ruta
+        self._fabrica = sqlite3.Connection
+        if monitor is not None:
+            self._fabrica = type("ConexionMonitorizada", (_ConexionMonitorizada,), {"monitor": monitor})
+        self._local = threading.local()
+        self._conexiones: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        try:
+            self._create_table_if_not_exists()
+            logging.info("Conexión a SQLite exitosa (%s).", ruta)
+        except sqlite3.Error as e:
+            logging.error("Error al abrir la base de datos SQLite: %s", e)
+            self.close()
+            raise ConnectionError(f"No se pudo abrir la base de datos: {e}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Devuelve la conexión del hilo actual, abriéndola la primera vez."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        with self._lock:
+            if self.ruta == ":memory:" and self._conexiones:
+                conn = self._conexiones[0]
+            else:
+                conn = sqlite3.connect(self.ruta, check_same_thread=False, cached_statements=256,
+                                       factory=self._fabrica)
+                conn.execute("PRAGMA journal_mode=WAL;")
+                conn.execute("PRAGMA synchronous=NORMAL;")
+                conn.execute("PRAGMA busy_timeout=5000;")
+                self._conexiones.append(conn)
+        self._local.conn = conn
+        return conn
+
+    def _create_table_if_not_exists(self):
+        """
+        Crea la tabla de productos y sus índices si no existen (mismo esquema que PostgreSQL).
+
+        La versión aplicada se guarda en `PRAGMA user_version`; si ya es VERSION_ESQUEMA no se
+        ejecuta ningún DDL.
+        """
+        conn = self._connection()
+        if conn.execute("PRAGMA user_version;").fetchone()[0] >= VERSION_ESQUEMA:
+            return
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS productos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    nombre VARCHAR(255) NOT NULL,
+                    precio NUMERIC(10, 2) NOT NULL,
+                    stock INTEGER NOT NULL,
+                    punto_reorden INTEGER,
+                    version INTEGER NOT NULL DEFAULT 1
+                );
+            """)
+            columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(productos);")}
+            if "punto_reorden" not in columnas:
+                conn.execute("ALTER TABLE productos ADD COLUMN punto_reorden INTEGER;")
+            if "version" not in columnas:
+                conn.execute("ALTER TABLE productos ADD COLUMN version INTEGER NOT NULL DEFAULT 1;")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_productos_stock ON productos (stock);")
+            # Índice parcial con sólo los productos por reponer según su punto de reorden.
+            conn.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_productos_reorden ON productos (stock)
+                WHERE stock <= COALESCE(punto_reorden, {UMBRAL_STOCK_BAJO});
+            """)
+            # Con NOCASE, SQLite puede resolver `nombre LIKE 'abc%'` recorriendo este índice.
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_productos_nombre ON productos (nombre COLLATE NOCASE);")
+            conn.execute(f"PRAGMA user_version = {VERSION_ESQUEMA};")
+        logging.info("Esquema de la base de datos actualizado a la versión %s.", VERSION_ESQUEMA)
+
+    def _row_factory(self, cur) -> Callable[[Sequence[Any]], Producto]:
+        """
+        Devuelve la función que convierte las filas de la consulta actual en objetos Producto.
+
+        La descripción de columnas se lee una sola vez por consulta; si coincide con el orden de
+        `Producto.__slots__` (lo habitual), cada fila se convierte sin crear diccionarios intermedios.
+        """
+        columnas = tuple(d[0] for d in cur.description)
+        if columnas == Producto.__slots__:
+            return Producto.desde_fila
+        return lambda row: Producto(**dict(zip(columnas, row)))
+
+    def _to_producto(self, cur, row) -> Producto | None:
+        """Convierte una única fila (o None) en un Producto."""
+        if row is None:
+            return None
+        return self._row_factory(cur)(row)
+
+    def get_all(self) -> List[Producto]:
+        """Obtiene todos los productos de la base de datos."""
+        try:
+            cur = self._connection().execute("SELECT id, nombre, precio, stock, punto_reorden, version FROM productos ORDER BY id;")
+            logging.info("Se han obtenido todos los productos.")
+            return list(map(self._row_factory(cur), cur.fetchall()))
+        except sqlite3.Error as e:
+            logging.error("Error al obtener todos los productos: %s", e)
+            return []
+
+    def iter_all(self, batch_size: int = 500) -> Iterator[Producto]:
+        """Recorre todos los productos por lotes de `batch_size` con `fetchmany`."""
+        total = 0
+        try:
+            cur = self._connection().execute("SELECT id, nombre, precio, stock, punto_reorden, version FROM productos ORDER BY id;")
+            crear = self._row_factory(cur)
+            while True:
+                filas = cur.fetchmany(batch_size)
+                if not filas:
+                    break
+                for row in filas:
+                    yield crear(row)
+                total += len(filas)
+            logging.info("Se han recorrido %s productos.", total)
+        except sqlite3.Error as e:
+            logging.error("Error al recorrer los productos: %s", e)
+            raise
+
+    def get_page(self, after_id: int = 0, limit: int = 20) -> List[Producto]:
+        """Obtiene una página de productos usando el ID como cursor."""
+        try:
+            cur = self._connection().execute(
+                "SELECT id, nombre, precio, stock, punto_reorden, version FROM productos WHERE id > ? ORDER BY id LIMIT ?;",
+                (after_id, limit)
+            )
+            productos = list(map(self._row_factory(cur), cur.fetchall()))
+            logging.info("Se han obtenido %s productos tras el ID %s.", len(productos), after_id)
+            return productos
+        except sqlite3.Error as e:
+            logging.error("Error al obtener la página de productos tras el ID %s: %s", after_id, e)
+            return []
+
+    def search_by_name(self, termino: str, limit: int = 20) -> List[Producto]:
+        """Busca productos cuyo nombre empieza por `termino`, usando el índice NOCASE sobre el nombre."""
+        patron = escapar_like(termino.strip()) + "%"
+        try:
+            cur = self._connection().execute(
+                "SELECT id, nombre, precio, stock, punto_reorden, version FROM productos WHERE nombre LIKE ? ESCAPE '\\' "
+                "ORDER BY nombre COLLATE NOCASE, id LIMIT ?;",
+                (patron, limit)
+            )
+            productos = list(map(self._row_factory(cur), cur.fetchall()))
+            logging.info("La búsqueda '%s' devolvió %s productos.", termino, len(productos))
+            return productos
+        except sqlite3.Error as e:
+            logging.error("Error al buscar productos por nombre '%s': %s", termino, e)
+            return []
+
+    def get_by_id(self, id_producto: int) -> Producto | None:
+        """Obtiene un producto por su ID."""
+        try:
+            cur = self._connection().execute("SELECT id, nombre, precio, stock, punto_reorden, version FROM productos WHERE id = ?;", (id_producto,))
+            producto = self._to_producto(cur, cur.fetchone())
+            if producto:
+                logging.info("Producto con ID %s obtenido.", id_producto)
+            else:
+                logging.warning("No se encontró producto con ID %s.", id_producto)
+            return producto
+        except sqlite3.Error as e:
+            logging.error("Error al obtener producto con ID %s: %s", id_producto, e)
+            return None
+
+    def get_by_ids(self, ids: Iterable[int]) -> List[Producto]:
+        """Obtiene varios productos en una sola consulta (los IDs se pasan como un arreglo JSON)."""
+        ids = [int(id_producto) for id_producto in ids]
+        if not ids:
+            return []
+        try:
+            cur = self._connection().execute(
+                "SELECT id, nombre, precio, stock, punto_reorden, version FROM productos "
+                "WHERE id IN (SELECT value FROM json_each(?)) ORDER BY id;",
+                (json.dumps(ids),)
+            )
+            productos = list(map(self._row_factory(cur), cur.fetchall()))
+            logging.info("Se han obtenido %s de %s productos solicitados.", len(productos), len(ids))
+            return productos
+        except sqlite3.Error as e:
+            logging.error("Error al obtener %s productos por ID: %s", len(ids), e)
+            return []
+
+    def create(self, data: Dict[str, Any]) -> Producto | None:
+        """Crea un nuevo producto en la base de datos."""
+        try:
+            conn = self._connection()
+            with conn:
+                cur = conn.execute(
+                    "INSERT INTO productos (nombre, precio, stock, punto_reorden) VALUES (?, ?, ?, ?) RETURNING id, nombre, precio, stock, punto_reorden, version;",
+                    (data['nombre'], data['precio'], data['stock'], data.get('punto_reorden'))
+                )
+                new_product = self._to_producto(cur, cur.fetchone())
+            logging.info("Producto creado: %s", new_product)
+            return new_product
+        except sqlite3.Error as e:
+            logging.error("Error al crear producto con datos %s: %s", data, e)
+            return None
+
+    def update(self, id_producto: int, data: Dict[str, Any]) -> Producto | None:
+        """Actualiza un producto existente en la base de datos."""
+        try:
+            conn = self._connection()
+            with conn:
+                cur = conn.execute(
+                    "UPDATE productos SET nombre = ?, precio = ?, stock = ?, punto_reorden = COALESCE(?, punto_reorden), version = version + 1 "
+                    "WHERE id = ? RETURNING id, nombre, precio, stock, punto_reorden, version;",
+                    (data['nombre'], data['precio'], data['stock'], data.get('punto_reorden'), id_producto)
+                )
+                updated_product = self._to_producto(cur, cur.fetchone())
+            if updated_product:
+                logging.info("Producto con ID %s actualizado.", id_producto)
+            else:
+                logging.warning("Intento de actualizar producto no existente con ID %s.", id_producto)
+            return updated_product
+        except sqlite3.Error as e:
+            logging.error("Error al actualizar producto con ID %s: %s", id_producto, e)
+            return None
+
+    def patch(self, id_producto: int, version_esperada: int | None = None, **campos) -> Producto | None:
+        """Actualiza sólo los campos indicados; con `version_esperada` aplica control de concurrencia optimista."""
+        validar_campos(campos)
+        if not campos:
+            return self.get_by_id(id_producto)
+        # Los nombres de columna provienen de CAMPOS_EDITABLES, nunca de la entrada del usuario.
+        asignaciones = ", ".join(f"{campo} = ?" for campo in campos)
+        consulta = f"UPDATE productos SET {asignaciones}, version = version + 1 WHERE id = ?"
+        parametros = [*campos.values(), id_producto]
+        if version_esperada is not None:
+            consulta += " AND version = ?"
+            parametros.append(version_esperada)
+        consulta += " RETURNING id, nombre, precio, stock, punto_reorden, version;"
+        conflicto = False
+        try:
+            conn = self._connection()
+            with conn:
+                cur = conn.execute(consulta, parametros)
+                updated_product = self._to_producto(cur, cur.fetchone())
+                if updated_product is None and version_esperada is not None:
+                    conflicto = conn.execute("SELECT 1 FROM productos WHERE id = ?;", (id_producto,)).fetchone() is not None
+        except sqlite3.Error as e:
+            logging.error("Error al modificar producto con ID %s: %s", id_producto, e)
+            return None
+        if conflicto:
+            logging.warning("Conflicto de versión al modificar producto con ID %s (se esperaba la versión %s).", id_producto, version_esperada)
+            raise ConflictoDeVersion(f"El producto con ID {id_producto} fue modificado por otro proceso.")
+        if updated_product:
+            logging.info("Producto con ID %s modificado: %s.", id_producto, ', '.join(campos))
+        else:
+            logging.warning("Intento de modificar producto no existente con ID %s.", id_producto)
+        return updated_product
+
+    def delete(self, id_producto: int) -> bool:
+        """Elimina un producto de la base de datos."""
+        try:
+            conn = self._connection()
+            with conn:
+                cur = conn.execute("DELETE FROM productos WHERE id = ?;", (id_producto,))
+            if cur.rowcount > 0:
+                logging.info("Producto con ID %s eliminado.", id_producto)
+                return True
+            else:
+                logging.warning("Intento de eliminar producto no existente con ID %s.", id_producto)
+                return False
+        except sqlite3.Error as e:
+            logging.error("Error al eliminar producto con ID %s: %s", id_producto, e)
+            return False
+
+    # Filas por sentencia INSERT de `create_many`: 4 parámetros por fila, por debajo del límite de
+    # 999 variables de las versiones antiguas de SQLite.
+    _FILAS_POR_INSERT = 200
+
+    def create_many(self, data: Iterable[Dict[str, Any]]) -> List[int]:
+        """
+        Crea varios productos en una sola transacción y devuelve sus IDs en el orden de `data`.
+
+        Se insertan con sentencias INSERT de varias filas (VALUES (...), (...) RETURNING id). Dentro
+        de la transacción nadie más escribe, así que cada fila recibe el siguiente rowid y los IDs
+        ordenados coinciden con el orden de inserción.
+        """
+        filas = [(d['nombre'], d['precio'], d['stock'], d.get('punto_reorden')) for d in data]
+        if not filas:
+            return []
+        try:
+            conn = self._connection()
+            ids: List[int] = []
+            with conn:
+                for inicio in range(0, len(filas), self._FILAS_POR_INSERT):
+                    bloque = filas[inicio:inicio + self._FILAS_POR_INSERT]
+                    cur = conn.execute(
+                        "INSERT INTO productos (nombre, precio, stock, punto_reorden) VALUES "
+                        + ", ".join(["(?, ?, ?, ?)"] * len(bloque)) + " RETURNING id;",
+                        [valor for fila in bloque for valor in fila]
+                    )
+                    ids.extend(sorted(id_producto for (id_producto,) in cur.fetchall()))
+            logging.info("Se han creado %s productos en bloque.", len(ids))
+            return ids
+        except sqlite3.Error as e:
+            logging.error("Error al crear %s productos en bloque: %s", len(filas), e)
+            return []
+
+    def update_many(self, data: Iterable[Dict[str, Any]]) -> int:
+        """Actualiza varios productos en una sola transacción."""
+        filas = [(d['nombre'], d['precio'], d['stock'], d.get('punto_reorden'), d['id']) for d in data]
+        if not filas:
+            return 0
+        try:
+            conn = self._connection()
+            with conn:
+                cur = conn.executemany(
+                    "UPDATE productos SET nombre = ?, precio = ?, stock = ?, punto_reorden = COALESCE(?, punto_reorden), version = version + 1 WHERE id = ?;",
+                    filas
+                )
+            logging.info("Se han actualizado %s productos en bloque.", cur.rowcount)
+            return cur.rowcount
+        except sqlite3.Error as e:
+            logging.error("Error al actualizar %s productos en bloque: %s", len(filas), e)
+            return 0
+
+    def delete_many(self, ids: Iterable[int]) -> int:
+        """Elimina varios productos en una sola transacción."""
+        ids = [(id_producto,) for id_producto in ids]
+        if not ids:
+            return 0
+        try:
+            conn = self._connection()
+            with conn:
+                cur = conn.executemany("DELETE FROM productos WHERE id = ?;", ids)
+            logging.info("Se han eliminado %s productos en bloque.", cur.rowcount)
+            return cur.rowcount
+        except sqlite3.Error as e:
+            logging.error("Error al eliminar %s productos en bloque: %s", len(ids), e)
+            return 0
+
+    def get_by_low_stock(self, umbral: int | None = None, limite: int | None = None) -> List[Producto]:
+        """Obtiene productos con stock bajo según `umbral` o, si no se indica, según su punto de reorden."""
+        try:
+            if umbral is None:
+                cur = self._connection().execute(
+                    "SELECT id, nombre, precio, stock, punto_reorden, version FROM productos "
+                    f"WHERE stock <= COALESCE(punto_reorden, {UMBRAL_STOCK_BAJO}) ORDER BY stock, id LIMIT ?;",
+                    (-1 if limite is None else limite,)
+                )
+            else:
+                cur = self._connection().execute(
+                    "SELECT id, nombre, precio, stock, punto_reorden, version FROM productos WHERE stock <= ? ORDER BY stock, id LIMIT ?;",
+                    (umbral, -1 if limite is None else limite)
+                )
+            productos = list(map(self._row_factory(cur), cur.fetchall()))
+            logging.info("Se han obtenido %s productos con stock bajo.", len(productos))
+            return productos
+        except sqlite3.Error as e:
+            logging.error("Error al obtener productos con stock bajo: %s", e)
+            return []
+
+    def get_inventory_summary(self, umbral: int | None = None, top: int = 5) -> Dict[str, Any]:
+        """Calcula valor total, bandas de stock y top-N por valor con una única consulta agregada."""
+        try:
+            cur = self._connection().execute(
+                f"""
+                SELECT count(*),
+                       COALESCE(sum(stock), 0),
+                       COALESCE(sum(precio * stock), 0),
+                       COALESCE(sum(stock = 0), 0),
+                       COALESCE(sum(stock > 0 AND stock <= COALESCE(:umbral, punto_reorden, {UMBRAL_STOCK_BAJO})), 0),
+                       COALESCE(sum(stock > COALESCE(:umbral, punto_reorden, {UMBRAL_STOCK_BAJO})), 0),
+                       (SELECT json_group_array(json_object('id', id, 'nombre', nombre, 'precio', precio,
+                                                            'stock', stock, 'valor', valor))
+                        FROM (SELECT id, nombre, precio, stock, precio * stock AS valor
+                              FROM productos ORDER BY precio * stock DESC, id LIMIT :top))
+                FROM productos;
+                """,
+                {"umbral": umbral, "top": top}
+            )
+            fila = cur.fetchone()
+            logging.info("Se ha calculado el resumen del inventario.")
+            return resumen_desde_fila(fila)
+        except sqlite3.Error as e:
+            logging.error("Error al calcular el resumen del inventario: %s", e)
+            return {}
+
+    def adjust_stock(self, id_producto: int, delta: int) -> Producto | None:
+        """Suma `delta` al stock con `stock = stock + delta`; la condición del WHERE impide dejarlo negativo."""
+        insuficiente = False
+        try:
+            conn = self._connection()
+            with conn:
+                cur = conn.execute(
+                    "UPDATE productos SET stock = stock + :delta, version = version + 1 "
+                    "WHERE id = :id AND stock + :delta >= 0 "
+                    "RETURNING id, nombre, precio, stock, punto_reorden, version;",
+                    {"id": id_producto, "delta": delta}
+                )
+                producto = self._to_producto(cur, cur.fetchone())
+                if producto is None:
+                    insuficiente = conn.execute("SELECT 1 FROM productos WHERE id = ?;", (id_producto,)).fetchone() is not None
+        except sqlite3.Error as e:
+            logging.error("Error al ajustar el stock del producto con ID %s: %s", id_producto, e)
+            return None
+        if insuficiente:
+            logging.warning("Stock insuficiente para ajustar en %s el producto con ID %s.", delta, id_producto)
+            raise StockInsuficiente([id_producto])
+        if producto:
+            logging.info("Stock del producto con ID %s ajustado en %s (queda %s).", id_producto, delta, producto['stock'])
+        else:
+            logging.warning("Intento de ajustar el stock de un producto no existente con ID %s.", id_producto)
+        return producto
+
+    def apply_order(self, lineas: Iterable[Tuple[int, int]]) -> List[Producto]:
+        """
+        Aplica las líneas del pedido en una transacción abierta con `BEGIN IMMEDIATE`, que toma el
+        bloqueo de escritura desde el principio: la comprobación de stock y la actualización no
+        pueden intercalarse con otro pedido.
+        """
+        deltas = agrupar_lineas(lineas)
+        if not deltas:
+            return []
+        ids_json = json.dumps(list(deltas))
+        inexistentes: List[int] = []
+        insuficientes: List[int] = []
+        productos: List[Producto] = []
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                actuales = dict(conn.execute(
+                    "SELECT id, stock FROM productos WHERE id IN (SELECT value FROM json_each(?)) ORDER BY id;",
+                    (ids_json,)
+                ).fetchall())
+                inexistentes = [i for i in deltas if i not in actuales]
+                insuficientes = [i for i in deltas if i in actuales and actuales[i] + deltas[i] < 0]
+                if inexistentes or insuficientes:
+                    conn.rollback()
+                else:
+                    conn.executemany(
+                        "UPDATE productos SET stock = stock + ?, version = version + 1 WHERE id = ?;",
+                        [(delta, id_producto) for id_producto, delta in deltas.items()]
+                    )
+                    cur = conn.execute(
+                        "SELECT id, nombre, precio, stock, punto_reorden, version FROM productos "
+                        "WHERE id IN (SELECT value FROM json_each(?)) ORDER BY id;",
+                        (ids_json,)
+                    )
+                    productos = list(map(self._row_factory(cur), cur.fetchall()))
+                    conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        except sqlite3.Error as e:
+            logging.error("Error al aplicar un pedido de %s productos: %s", len(deltas), e)
+            return []
+        if inexistentes:
+            logging.warning("Pedido rechazado: no existen los productos con ID %s.", inexistentes)
+            raise ValueError(f"No existen los productos con ID {', '.join(map(str, inexistentes))}.")
+        if insuficientes:
+            logging.warning("Pedido rechazado: stock insuficiente para los productos con ID %s.", insuficientes)
+            raise StockInsuficiente(insuficientes)
+        logging.info("Pedido aplicado sobre %s productos.", len(productos))
+        return productos
+
+    def close(self):
+        """Cierra las conexiones abiertas por todos los hilos."""
+        with self._lock:
+            for conn in self._conexiones:
+                conn.close()
+            self._conexiones.clear()
+        self._local = threading.local()
+
+    def __del__(self):
+        """Cierra las conexiones cuando el objeto es destruido."""
+        self.close()
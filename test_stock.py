@@ -0,0 +1,152 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from cached_repository import CachedProductoRepository
+from repositorio import StockInsuficiente, agrupar_lineas
+from sqlite_repository import SqliteProductoRepository
+
+# Pruebas de adjust_stock y apply_order sobre el backend SQLite (sin servidor de base de datos).
+#
+#   python -m unittest test_stock
+#   python -m pytest -q test_stock.py
+
+
+class AgruparLineasTest(unittest.TestCase):
+
+    def test_suma_deltas_por_producto_y_ordena_por_id(self):
+        self.assertEqual(agrupar_lineas([(7, -1), (3, -2), (7, -4), (3, 5)]), {3: 3, 7: -5})
+        self.assertEqual(list(agrupar_lineas([(9, 1), (2, 1), (5, 1)])), [2, 5, 9])
+
+    def test_rechaza_lineas_no_enteras(self):
+        for linea in [("1", -1), (1, 2.5), (1, True), (None, 1)]:
+            with self.assertRaises(ValueError):
+                agrupar_lineas([linea])
+
+
+class StockSqliteTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.directorio = tempfile.mkdtemp(prefix="test_stock_")
+        self.repo = SqliteProductoRepository(os.path.join(self.directorio, "stock.db"))
+        self.a = self.repo.create({"nombre": "SSD 1TB", "precio": 89.9, "stock": 10})
+        self.b = self.repo.create({"nombre": "Ratón", "precio": 19.5, "stock": 3})
+
+    def tearDown(self):
+        self.repo.close()
+        shutil.rmtree(self.directorio, ignore_errors=True)
+        logging.disable(logging.NOTSET)
+
+    def stock(self, producto) -> int:
+        return self.repo.get_by_id(producto['id'])['stock']
+
+    def test_adjust_stock_suma_y_versiona(self):
+        producto = self.repo.adjust_stock(self.a['id'], -4)
+        self.assertEqual(producto['stock'], 6)
+        self.assertEqual(producto['version'], self.a['version'] + 1)
+        self.assertEqual(self.repo.adjust_stock(self.a['id'], 5)['stock'], 11)
+
+    def test_adjust_stock_no_deja_stock_negativo(self):
+        with self.assertRaises(StockInsuficiente) as error:
+            self.repo.adjust_stock(self.b['id'], -4)
+        self.assertEqual(error.exception.ids_producto, [self.b['id']])
+        self.assertEqual(self.stock(self.b), 3)
+        self.assertEqual(self.repo.adjust_stock(self.b['id'], -3)['stock'], 0)
+
+    def test_adjust_stock_producto_inexistente(self):
+        self.assertIsNone(self.repo.adjust_stock(999, 1))
+
+    def test_apply_order_agrupa_lineas_y_devuelve_por_id(self):
+        productos = self.repo.apply_order([(self.b['id'], -1), (self.a['id'], -2), (self.b['id'], -1)])
+        self.assertEqual([p['id'] for p in productos], sorted([self.a['id'], self.b['id']]))
+        self.assertEqual(self.stock(self.a), 8)
+        self.assertEqual(self.stock(self.b), 1)
+
+    def test_apply_order_sin_stock_no_aplica_ninguna_linea(self):
+        with self.assertRaises(StockInsuficiente) as error:
+            self.repo.apply_order([(self.a['id'], -1), (self.b['id'], -2), (self.b['id'], -2)])
+        self.assertEqual(error.exception.ids_producto, [self.b['id']])
+        self.assertEqual(self.stock(self.a), 10)
+        self.assertEqual(self.stock(self.b), 3)
+
+    def test_apply_order_con_producto_inexistente_no_aplica_ninguna_linea(self):
+        with self.assertRaises(ValueError):
+            self.repo.apply_order([(self.a['id'], -1), (999, -1)])
+        self.assertEqual(self.stock(self.a), 10)
+
+    def test_apply_order_vacio(self):
+        self.assertEqual(self.repo.apply_order([]), [])
+
+    def test_cache_no_sirve_stock_obsoleto(self):
+        cache = CachedProductoRepository(self.repo, ttl=60)
+        self.assertEqual(cache.get_by_id(self.a['id'])['stock'], 10)
+        cache.adjust_stock(self.a['id'], -1)
+        self.assertEqual(cache.get_by_id(self.a['id'])['stock'], 9)
+        with self.assertRaises(StockInsuficiente):
+            cache.apply_order([(self.a['id'], -1), (self.b['id'], -50)])
+        cache.apply_order([(self.a['id'], -2)])
+        self.assertEqual(cache.get_by_id(self.a['id'])['stock'], 7)
+
+    def test_pedidos_concurrentes_no_venden_de_mas(self):
+        hilos, pedidos_por_hilo = 8, 25
+        self.repo.patch(self.a['id'], stock=100)
+        self.repo.patch(self.b['id'], stock=100)
+        resultados = {"aplicados": 0, "rechazados": 0, "errores": 0}
+        cerrojo = threading.Lock()
+
+        def vender(indice: int):
+            # La mitad de los hilos pide las líneas en orden inverso: el backend debe bloquear las
+            # filas siempre por ID para que los pedidos cruzados no se interbloqueen.
+            if indice % 2:
+                lineas = [(self.a['id'], -1), (self.b['id'], -1)]
+            else:
+                lineas = [(self.b['id'], -1), (self.a['id'], -1)]
+            for _ in range(pedidos_por_hilo):
+                try:
+                    self.repo.apply_order(lineas)
+                    resultado = "aplicados"
+                except StockInsuficiente:
+                    resultado = "rechazados"
+                except Exception:
+                    resultado = "errores"
+                with cerrojo:
+                    resultados[resultado] += 1
+
+        trabajadores = [threading.Thread(target=vender, args=(indice,)) for indice in range(hilos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+
+        self.assertEqual(resultados, {"aplicados": 100, "rechazados": hilos * pedidos_por_hilo - 100, "errores": 0})
+        self.assertEqual(self.stock(self.a), 0)
+        self.assertEqual(self.stock(self.b), 0)
+
+    def test_ajustes_concurrentes_no_venden_de_mas(self):
+        self.repo.patch(self.a['id'], stock=50)
+        vendidos = []
+
+        def vender():
+            for _ in range(20):
+                try:
+                    if self.repo.adjust_stock(self.a['id'], -1) is not None:
+                        vendidos.append(1)
+                except StockInsuficiente:
+                    pass
+
+        trabajadores = [threading.Thread(target=vender) for _ in range(6)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+
+        self.assertEqual(len(vendidos), 50)
+        self.assertEqual(self.stock(self.a), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()